@@ -0,0 +1,4 @@
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# Строк на один запрос при потоковой выгрузке.
+EXPORT_CHUNK = 1000
@@ -0,0 +1,85 @@
+"""Ресурсы API: какие поля можно запросить и откуда они берутся.
+
+Поле ресурса — путь для `QuerySet.values()`. Клиент выбирает поля
+параметром `?fields=`, и в запрос попадают только они (плюс ключ
+сортировки для курсора), поэтому таблицы авторов и групп
+присоединяются, только если их поля нужны, а модели не создаются вовсе.
+"""
+from django.core.files.storage import default_storage
+
+from posts.constants import KEYSET_ORDERING
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def image_url(name):
+    return default_storage.url(name) if name else None
+
+
+class Resource:
+    def __init__(self, fields, ordering, converters=None):
+        self.fields = fields
+        self.ordering = tuple(ordering)
+        self.converters = converters or {}
+
+    def select(self, requested):
+        """Имена полей из значения `?fields=`; пустое значение — все поля."""
+        if not requested:
+            return list(self.fields)
+        names = [name.strip() for name in requested.split(',')]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise InvalidFields(
+                'Неизвестные поля: ' + ', '.join(unknown)
+                + '. Доступны: ' + ', '.join(self.fields)
+            )
+        return list(dict.fromkeys(names))
+
+    def values(self, queryset, names):
+        keys = {field.lstrip('-') for field in self.ordering}
+        paths = {self.fields[name] for name in names} | keys
+        return queryset.values(*paths)
+
+    def serialize(self, row, names):
+        result = {}
+        for name in names:
+            value = row[self.fields[name]]
+            convert = self.converters.get(name)
+            result[name] = convert(value) if convert else value
+        return result
+
+
+POSTS = Resource(
+    fields={
+        'id': 'id',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'image': 'image',
+        'comment_count': 'comment_count',
+    },
+    ordering=KEYSET_ORDERING,
+    converters={'image': image_url},
+)
+GROUPS = Resource(
+    fields={
+        'id': 'id',
+        'slug': 'slug',
+        'title': 'title',
+        'description': 'description',
+    },
+    ordering=('id',),
+)
+COMMENTS = Resource(
+    fields={
+        'id': 'id',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    },
+    ordering=('created', 'id'),
+)
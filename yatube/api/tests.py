@@ -0,0 +1,125 @@
+import json
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Ivank')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост номер {number}',
+                author=cls.author,
+                group=cls.group if number % 2 else None,
+            )
+            for number in range(5)
+        ]
+
+    def setUp(self):
+        self.client = Client()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_fields(self):
+        """Клиент получает только запрошенные поля."""
+        response = self.client.get(
+            reverse('api:post_list'), {'fields': 'id,author'}
+        )
+        self.assertEqual(response.json()['results'][0], {
+            'id': self.posts[-1].pk, 'author': self.author.username,
+        })
+        response = self.client.get(
+            reverse('api:post_list'), {'fields': 'id,password'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_cursor_walks_all_posts(self):
+        """Ссылки next проходят все посты без повторов и пропусков."""
+        url = reverse('api:post_list') + '?limit=2&fields=id'
+        seen = []
+        while url:
+            with self.assertNumQueries(1):
+                data = self.client.get(url).json()
+            seen.extend(row['id'] for row in data['results'])
+            url = data['next']
+        self.assertEqual(seen, [post.pk for post in reversed(self.posts)])
+        # '!' не base64, а WzAsIDUsIDVd — это [0, 5, 5].
+        for cursor in ('!', 'WzAsIDUsIDVd'):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(
+                    reverse('api:post_list'), {'cursor': cursor}
+                )
+                self.assertEqual(response.status_code, 400)
+
+    def test_filters(self):
+        """Посты фильтруются по группе и автору."""
+        response = self.client.get(
+            reverse('api:post_list'),
+            {'group': self.group.slug, 'author': self.author.username},
+        )
+        self.assertEqual(
+            {row['group'] for row in response.json()['results']},
+            {self.group.slug},
+        )
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_detail_and_comments(self):
+        """Пост и его комментарии отдаются по id, чужой id — 404."""
+        post = self.posts[0]
+        Comment.objects.create(post=post, author=self.author, text='Ответ')
+        response = self.client.get(
+            reverse('api:post_detail', kwargs={'post_id': post.pk})
+        )
+        self.assertEqual(response.json()['text'], post.text)
+        response = self.client.get(
+            reverse('api:comment_list', kwargs={'post_id': post.pk}),
+            {'fields': 'text,post'},
+        )
+        self.assertEqual(
+            response.json()['results'], [{'text': 'Ответ', 'post': post.pk}]
+        )
+        response = self.client.get(
+            reverse('api:post_detail', kwargs={'post_id': 0})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_export_streams_ndjson(self):
+        """Выгрузка отдаёт все посты построчно, читая их порциями."""
+        response = self.client.get(
+            reverse('api:post_export'), {'fields': 'id,group'}
+        )
+        self.assertTrue(response.streaming)
+        with mock.patch('api.views.EXPORT_CHUNK', 2), \
+                self.assertNumQueries(3):
+            rows = [
+                json.loads(line)
+                for line in b''.join(response.streaming_content).splitlines()
+            ]
+        self.assertEqual(len(rows), len(self.posts))
+        self.assertEqual(rows[-1], {'id': self.posts[0].pk, 'group': None})
+
+    def test_groups(self):
+        response = self.client.get(reverse('api:group_list'))
+        self.assertEqual(response.json()['results'], [{
+            'id': self.group.pk,
+            'slug': 'group',
+            'title': 'Группа',
+            'description': '',
+        }])
+
+    def test_read_only(self):
+        """API принимает только GET и HEAD."""
+        response = self.client.post(reverse('api:post_list'))
+        self.assertEqual(response.status_code, 405)
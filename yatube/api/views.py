@@ -0,0 +1,137 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_safe
+
+from posts import conditional
+from posts.models import Comment, Group, Post
+from posts.utils import InvalidCursor, KeysetPaginator
+
+from . import resources
+from .constants import EXPORT_CHUNK, MAX_PAGE_SIZE, PAGE_SIZE
+
+
+def error(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+
+def page_size(request):
+    try:
+        size = int(request.GET.get('limit', PAGE_SIZE))
+    except ValueError:
+        size = PAGE_SIZE
+    return min(max(size, 1), MAX_PAGE_SIZE)
+
+
+def link(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query['cursor'] = cursor
+    return request.build_absolute_uri('?' + query.urlencode())
+
+
+def paginated(request, resource, queryset):
+    """Страница ресурса по курсору со ссылками на соседние страницы."""
+    try:
+        names = resource.select(request.GET.get('fields'))
+    except resources.InvalidFields as invalid:
+        return error(str(invalid))
+    paginator = KeysetPaginator(
+        resource.values(queryset, names), page_size(request),
+        resource.ordering,
+    )
+    try:
+        page = paginator.page(request.GET.get('cursor'))
+    except InvalidCursor:
+        return error('Неверный курсор.')
+    return JsonResponse({
+        'results': [resource.serialize(row, names) for row in page],
+        'next': link(request, page.next_cursor),
+        'previous': link(request, page.previous_cursor),
+    })
+
+
+def filter_posts(request):
+    posts = Post.objects.all()
+    if 'group' in request.GET:
+        posts = posts.filter(group__slug=request.GET['group'])
+    if 'author' in request.GET:
+        posts = posts.filter(author__username=request.GET['author'])
+    return posts
+
+
+@require_safe
+@conditional.validated(conditional.index_scopes)
+def post_list(request):
+    return paginated(request, resources.POSTS, filter_posts(request))
+
+
+@require_safe
+@conditional.validated(conditional.post_scopes)
+def post_detail(request, post_id):
+    resource = resources.POSTS
+    try:
+        names = resource.select(request.GET.get('fields'))
+    except resources.InvalidFields as invalid:
+        return error(str(invalid))
+    row = resource.values(Post.objects.filter(pk=post_id), names).first()
+    if row is None:
+        return error('Пост не найден.', status=404)
+    return JsonResponse(resource.serialize(row, names))
+
+
+@require_safe
+@conditional.validated(conditional.post_scopes)
+def comment_list(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        return error('Пост не найден.', status=404)
+    return paginated(
+        request, resources.COMMENTS, Comment.objects.filter(post_id=post_id)
+    )
+
+
+@require_safe
+@conditional.validated(conditional.groups_scopes)
+def group_list(request):
+    return paginated(request, resources.GROUPS, Group.objects.all())
+
+
+def stream(resource, queryset, names):
+    """Строки NDJSON, читаемые из базы порциями по курсору.
+
+    Каждая порция — отдельный короткий запрос, поэтому выгрузка любого
+    размера не держит в памяти весь результат и не держит открытым
+    курсор базы, пока клиент медленно читает ответ.
+    """
+    paginator = KeysetPaginator(
+        resource.values(queryset, names), EXPORT_CHUNK, resource.ordering
+    )
+    page = paginator.page(None)
+    while True:
+        for row in page:
+            yield json.dumps(
+                resource.serialize(row, names),
+                cls=DjangoJSONEncoder,
+                ensure_ascii=False,
+            ) + '\n'
+        if not page.has_next():
+            return
+        page = paginator.page(page.next_cursor)
+
+
+@require_safe
+@conditional.validated(conditional.index_scopes)
+def post_export(request):
+    resource = resources.POSTS
+    try:
+        names = resource.select(request.GET.get('fields'))
+    except resources.InvalidFields as invalid:
+        return error(str(invalid))
+    response = StreamingHttpResponse(
+        stream(resource, filter_posts(request), names),
+        content_type='application/x-ndjson; charset=utf-8',
+    )
+    response['Content-Disposition'] = 'attachment; filename="posts.ndjson"'
+    return response
@@ -0,0 +1,130 @@
+"""Снимок вошедшего пользователя в сессии.
+
+Обычный `AuthenticationMiddleware` читает строку `auth_user` на каждый
+запрос, хотя страницам нужны только имя и флаги пользователя. Здесь эти
+поля хранятся в сессии подписанным снимком, и пользователь собирается
+из него через `User.from_db`; остальные поля отложены и при обращении
+загрузятся как обычно.
+
+Снимок годен, пока не изменилась версия пользователя в кеше: её
+меняет каждое сохранение `User` (в том числе смена пароля), и тогда
+пользователь снова читается из базы штатным `auth.get_user` с проверкой
+хеша пароля. Если версия вытеснена из кеша, снимок тоже считается
+устаревшим.
+
+`QuerySet.update()` сигналов не посылает, поэтому массовые изменения
+пользователей нужно делать через `update_users()`. Изменение в обход
+него (SQL, shell) снимок увидит не позже чем через MAX_AGE секунд.
+Сотрудникам и суперпользователям снимок не выдаётся: снятие их прав
+должно действовать сразу.
+"""
+import uuid
+
+from django.contrib import auth
+from django.contrib.auth import HASH_SESSION_KEY, SESSION_KEY
+from django.core import signing
+from django.core.cache import cache
+from django.db import router, transaction
+
+SNAPSHOT_KEY = '_auth_user_snapshot'
+SALT = 'core.auth.snapshot'
+FIELDS = (
+    'id', 'username', 'first_name', 'last_name', 'is_active', 'is_staff',
+    'is_superuser',
+)
+MAX_AGE = 300
+
+
+def version_key(user_id):
+    return f'auth:version:{user_id}'
+
+
+def touch(*user_ids):
+    """Сделать недействительными все снимки пользователей."""
+    cache.set_many(
+        {version_key(user_id): uuid.uuid4().hex for user_id in user_ids},
+        None,
+    )
+
+
+def update_users(queryset, **fields):
+    """`queryset.update(**fields)` вместе со сбросом снимков."""
+    using = router.db_for_write(queryset.model)
+    with transaction.atomic(using=using):
+        ids = list(queryset.using(using).values_list('pk', flat=True))
+        updated = queryset.model._default_manager.using(using).filter(
+            pk__in=ids
+        ).update(**fields)
+    touch(*ids)
+    return updated
+
+
+def _snapshotted(user):
+    return user.is_authenticated and not (
+        user.is_staff or user.is_superuser
+    )
+
+
+def current_version(user_id):
+    key = version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def restore(session):
+    """Пользователь из снимка или None, если снимок не годится."""
+    signed = session.get(SNAPSHOT_KEY)
+    if signed is None:
+        return None
+    try:
+        snapshot = signing.loads(signed, salt=SALT, max_age=MAX_AGE)
+    except signing.BadSignature:
+        # В том числе SignatureExpired.
+        return None
+    user_id = session.get(SESSION_KEY)
+    if (
+        str(snapshot['id']) != str(user_id)
+        or snapshot['hash'] != session.get(HASH_SESSION_KEY)
+        or snapshot['version'] != cache.get(version_key(user_id))
+        or snapshot['is_staff']
+        or snapshot['is_superuser']
+    ):
+        return None
+    User = auth.get_user_model()
+    # from_db ждёт значения в порядке полей модели.
+    return User.from_db(
+        router.db_for_read(User),
+        FIELDS,
+        [
+            snapshot[field.attname] for field in User._meta.concrete_fields
+            if field.attname in FIELDS
+        ],
+    )
+
+
+def get_user(request):
+    """Как `auth.get_user`, но по возможности без запроса к базе."""
+    session = request.session
+    user = restore(session)
+    if user is not None:
+        return user
+    user_id = session.get(SESSION_KEY)
+    # Версия читается до пользователя: сохранение между ними
+    # сделает новый снимок недействительным.
+    version = current_version(user_id) if user_id is not None else None
+    user = auth.get_user(request)
+    if _snapshotted(user):
+        session[SNAPSHOT_KEY] = signing.dumps(
+            {
+                **{field: getattr(user, field) for field in FIELDS},
+                'hash': session.get(HASH_SESSION_KEY),
+                'version': version,
+            },
+            salt=SALT,
+        )
+    else:
+        session.pop(SNAPSHOT_KEY, None)
+    return user
@@ -0,0 +1,107 @@
+"""Карта идентичности запроса: одна строка базы — один объект.
+
+Представления, формы и шаблоны одного запроса получают пользователей,
+группы и посты через `identity(request)`: объект, уже загруженный
+кем-то раньше в этом запросе, отдаётся без SQL. Искать можно по
+первичному ключу или по уникальному полю (`username`, `slug`).
+
+Текущий пользователь попадает в карту при первом поиске пользователя,
+поэтому страница своего профиля или подписка на себя не читают его
+повторно. Вместе с объектом запоминаются связанные объекты, загруженные
+через `select_related`.
+
+Искать можно в модели, менеджере или QuerySet без условий: найденный в
+карте объект не проверяется ни фильтрами, ни аннотациями, поэтому такие
+QuerySet отвергаются. `select_related` применяется только при промахе,
+у найденного объекта недостающие связи загрузятся при обращении.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Model
+from django.http import Http404
+
+
+def _queryset(source):
+    """QuerySet из модели, менеджера или QuerySet без условий."""
+    if isinstance(source, type):
+        source = source._default_manager
+    queryset = source.all()
+    query = queryset.query
+    if (
+        query.where or query.annotations or query.extra
+        or not query.can_filter()
+    ):
+        raise ValueError(
+            f'{queryset.model._meta.label}: карта идентичности не '
+            f'применяет условия QuerySet'
+        )
+    return queryset
+
+
+class IdentityMap:
+    def __init__(self, request=None):
+        self._objects = {}
+        self._request = request
+
+    @staticmethod
+    def _field(model, name):
+        meta = model._meta.concrete_model._meta
+        field = meta.pk if name == 'pk' else meta.get_field(name)
+        if not field.unique:
+            raise ValueError(
+                f'{meta.label}.{field.name}: поле не уникально'
+            )
+        return meta.label, field
+
+    def _seed(self):
+        """Добавить текущего пользователя при первом поиске его модели."""
+        request, self._request = self._request, None
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            self.add(user)
+
+    def add(self, obj):
+        """Запомнить объект и загруженные вместе с ним связанные."""
+        meta = obj._meta.concrete_model._meta
+        deferred = obj.get_deferred_fields()
+        for field in meta.concrete_fields:
+            if field.unique and field.attname not in deferred:
+                value = getattr(obj, field.attname)
+                if value is not None:
+                    self._objects.setdefault(
+                        (meta.label, field.name, value), obj
+                    )
+        for related in obj._state.fields_cache.values():
+            if isinstance(related, Model):
+                self.add(related)
+        return obj
+
+    def get(self, model, **lookup):
+        """Объект по одному уникальному полю; DoesNotExist, если нет."""
+        queryset = _queryset(model)
+        (name, value), = lookup.items()
+        user_model = get_user_model()._meta.concrete_model
+        if self._request is not None and (
+            queryset.model._meta.concrete_model is user_model
+        ):
+            self._seed()
+        label, field = self._field(queryset.model, name)
+        key = (label, field.name, field.to_python(value))
+        if key not in self._objects:
+            return self.add(queryset.get(**lookup))
+        return self._objects[key]
+
+    def get_or_404(self, model, **lookup):
+        queryset = _queryset(model)
+        try:
+            return self.get(queryset, **lookup)
+        except queryset.model.DoesNotExist:
+            raise Http404(
+                f'{queryset.model._meta.object_name} не найден'
+            )
+
+
+def identity(request):
+    """Карта идентичности запроса `request`."""
+    if not hasattr(request, '_identity'):
+        request._identity = IdentityMap(request)
+    return request._identity
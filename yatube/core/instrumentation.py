@@ -0,0 +1,197 @@
+"""Учёт времени запроса: SQL, шаблоны, кеш.
+
+Показатели текущего запроса копятся в `Stats`, которую заводит
+`core.middleware.InstrumentationMiddleware`. SQL учитывается через
+`connection.execute_wrapper`, шаблоны — бэкендом
+`core.templates.TimedTemplates`, кеш — бэкендом `core.cache.SQLiteCache`.
+Вне запроса (команды, тесты) учёт не ведётся.
+
+Гистограммы по представлениям накапливаются в памяти процесса и раз в
+`FLUSH_INTERVAL` секунд сохраняются в общий кеш под ключом процесса,
+чтобы страница метрик видела все воркеры.
+"""
+import bisect
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache import cache
+
+# Верхние границы корзин гистограммы времени ответа, мс.
+BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+FLUSH_INTERVAL = 10
+# Снимки процессов, которые давно не обновлялись, пропадают сами.
+SNAPSHOT_TIMEOUT = 60 * 60
+PROCESSES_KEY = 'metrics:processes'
+SUMS = ('time', 'queries', 'sql_time', 'template_time', 'cache_hits',
+        'cache_misses')
+
+_local = threading.local()
+
+
+def _empty():
+    return {
+        'count': 0,
+        'buckets': [0] * (len(BUCKETS) + 1),
+        **dict.fromkeys(SUMS, 0),
+    }
+
+
+class Stats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.time = 0.0
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._depth = 0
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql_time += (time.perf_counter() - started) * 1000
+
+    def finish(self):
+        self.time = (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self):
+        return ', '.join((
+            f'db;dur={self.sql_time:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template_time:.1f}',
+            f'cache;desc="{self.cache_hits} hits, '
+            f'{self.cache_misses} misses"',
+            f'total;dur={self.time:.1f}',
+        ))
+
+
+def start():
+    _local.stats = Stats()
+    return _local.stats
+
+
+def stop():
+    _local.stats = None
+
+
+def current():
+    return getattr(_local, 'stats', None)
+
+
+@contextmanager
+def template():
+    """Учесть время рендеринга; вложенные шаблоны не считаются дважды."""
+    stats = current()
+    if stats is None:
+        yield
+        return
+    stats._depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats._depth -= 1
+        if not stats._depth:
+            stats.template_time += (time.perf_counter() - started) * 1000
+
+
+def cache_lookup(hits, misses):
+    stats = current()
+    if stats is not None:
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+
+
+class Registry:
+    """Гистограммы и суммы показателей по представлениям в процессе."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+        self._flushed = time.monotonic()
+
+    @property
+    def key(self):
+        return f'metrics:{socket.gethostname()}:{os.getpid()}'
+
+    def record(self, view, stats):
+        with self._lock:
+            entry = self._views.setdefault(view, _empty())
+            entry['count'] += 1
+            entry['buckets'][bisect.bisect_left(BUCKETS, stats.time)] += 1
+            for name in SUMS:
+                entry[name] += getattr(stats, name)
+            due = time.monotonic() - self._flushed >= FLUSH_INTERVAL
+        if due:
+            self.flush()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                view: {**entry, 'buckets': entry['buckets'][:]}
+                for view, entry in self._views.items()
+            }
+
+    def flush(self):
+        """Сохранить накопленное процессом в общий кеш."""
+        self._flushed = time.monotonic()
+        cache.set(self.key, self.snapshot(), SNAPSHOT_TIMEOUT)
+        processes = cache.get(PROCESSES_KEY, set())
+        if self.key not in processes:
+            cache.set(PROCESSES_KEY, processes | {self.key}, None)
+
+
+registry = Registry()
+
+
+def _percentile(buckets, count, fraction):
+    rank = count * fraction
+    seen = 0
+    for bound, number in zip(BUCKETS + (None,), buckets):
+        seen += number
+        if seen >= rank:
+            return bound
+    return None
+
+
+def summary():
+    """Сводка по представлениям всех процессов, включая текущий."""
+    registry.flush()
+    keys = cache.get(PROCESSES_KEY, set())
+    snapshots = cache.get_many(keys)
+    if len(snapshots) < len(keys):
+        cache.set(PROCESSES_KEY, set(snapshots), None)
+    views = {}
+    for snapshot in snapshots.values():
+        for view, entry in snapshot.items():
+            total = views.setdefault(view, _empty())
+            total['count'] += entry['count']
+            total['buckets'] = [
+                a + b for a, b in zip(total['buckets'], entry['buckets'])
+            ]
+            for name in SUMS:
+                total[name] += entry[name]
+    result = {}
+    for view, total in sorted(views.items()):
+        count = total['count']
+        result[view] = {
+            'count': count,
+            'histogram': dict(zip(
+                [str(bound) for bound in BUCKETS] + ['inf'],
+                total['buckets'],
+            )),
+            'p50': _percentile(total['buckets'], count, 0.5),
+            'p95': _percentile(total['buckets'], count, 0.95),
+            'p99': _percentile(total['buckets'], count, 0.99),
+            **{
+                f'mean_{name}': round(total[name] / count, 2)
+                for name in SUMS
+            },
+        }
+    return result
@@ -0,0 +1,78 @@
+import base64
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from .tasks import task
+
+# Поля письма, которые переносятся в задачу как есть.
+FIELDS = (
+    'subject', 'body', 'from_email', 'to', 'cc', 'bcc', 'reply_to',
+    'extra_headers', 'content_subtype',
+)
+
+
+def dump(message):
+    """Письмо в виде словаря для JSON-аргументов задачи."""
+    attachments = []
+    for attachment in message.attachments:
+        if not isinstance(attachment, tuple):
+            raise TypeError(
+                'Письмо с MIME-вложением нельзя поставить в очередь'
+            )
+        filename, content, mimetype = attachment
+        if isinstance(content, bytes):
+            content = {'base64': base64.b64encode(content).decode()}
+        attachments.append([filename, content, mimetype])
+    return {
+        **{field: getattr(message, field) for field in FIELDS},
+        'alternatives': [
+            list(alternative)
+            for alternative in getattr(message, 'alternatives', [])
+        ],
+        'attachments': attachments,
+    }
+
+
+def load(data, connection=None):
+    """Письмо, собранное из словаря `dump`."""
+    message = EmailMultiAlternatives(
+        subject=data['subject'],
+        body=data['body'],
+        from_email=data['from_email'],
+        to=data['to'],
+        cc=data['cc'],
+        bcc=data['bcc'],
+        reply_to=data['reply_to'],
+        headers=data['extra_headers'],
+        alternatives=[tuple(item) for item in data['alternatives']],
+        connection=connection,
+    )
+    message.content_subtype = data['content_subtype']
+    for filename, content, mimetype in data['attachments']:
+        if isinstance(content, dict):
+            content = base64.b64decode(content['base64'])
+        message.attach(filename, content, mimetype)
+    return message
+
+
+@task()
+def send_messages(messages):
+    connection = get_connection(settings.QUEUED_EMAIL_BACKEND)
+    connection.send_messages([load(data, connection) for data in messages])
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Отправка писем фоновой задачей через QUEUED_EMAIL_BACKEND.
+
+    Письмо передаётся задаче словарём простых полей (см. `dump`), а не
+    целым объектом: аргументы задач хранятся в базе как JSON.
+    """
+
+    def send_messages(self, email_messages):
+        messages = [dump(message) for message in email_messages]
+        if not messages:
+            return 0
+        send_messages.delay(messages)
+        return len(messages)
@@ -0,0 +1,65 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import tasks
+
+_stopping = False
+
+
+def _stop(signum, frame):
+    global _stopping
+    _stopping = True
+
+
+def _work(burst, poll):
+    # Воркер доделывает текущую задачу и выходит.
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    return tasks.work(burst=burst, poll=poll, should_stop=lambda: _stopping)
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает воркеры очереди фоновых задач (core.tasks): миниатюры, '
+        'раскладку лент, отправку писем.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=2,
+            help='Число процессов-воркеров.',
+        )
+        parser.add_argument(
+            '--poll', type=float, default=1.0,
+            help='Пауза между опросами пустой очереди, секунд.',
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Выполнить готовые задачи и выйти.',
+        )
+
+    def handle(self, *args, **options):
+        burst, poll = options['burst'], options['poll']
+        if options['workers'] <= 1:
+            done = _work(burst, poll)
+            self.stdout.write(f'Выполнено задач: {done}')
+            return
+        # Соединения родителя не должны достаться дочерним процессам.
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=_work, args=(burst, poll))
+            for _ in range(options['workers'])
+        ]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+                process.join()
+        self.stdout.write(self.style.SUCCESS('Воркеры остановлены'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from core import sessions
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит в таблицу django_session изменения сессий, которые '
+        'движок core.sessions пока держит только в кеше. Запускать по '
+        'cron раз в SESSION_MIRROR_INTERVAL секунд. С --warm также '
+        'загружает в кеш сессии из базы: так переходят с движка db.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--warm', action='store_true',
+            help='Загрузить в кеш сессии, которых в нём нет.',
+        )
+
+    def handle(self, *args, **options):
+        written, warmed = sessions.sync(warm=options['warm'])
+        self.stdout.write(f'Записано в базу: {written}')
+        if options['warm']:
+            self.stdout.write(f'Загружено в кеш: {warmed}')
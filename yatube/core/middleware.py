@@ -0,0 +1,97 @@
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.auth.middleware import (
+    AuthenticationMiddleware as BaseAuthenticationMiddleware
+)
+from django.db import connections
+from django.utils.functional import SimpleLazyObject
+
+from . import auth, instrumentation, routers
+
+# Куку закрепления за основной базой ставит любая запись.
+PIN_COOKIE = 'primary_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class InstrumentationMiddleware:
+    """Время ответа, SQL, шаблоны и кеш в заголовке `Server-Timing`.
+
+    Показатели попадают в гистограммы представлений, которые отдаёт
+    `core.views.metrics`. Стоит ставить первым в `MIDDLEWARE`, чтобы
+    учитывалась работа остальных middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = instrumentation.start()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(stats.execute)
+                    )
+                response = self.get_response(request)
+        finally:
+            instrumentation.stop()
+        stats.finish()
+        response['Server-Timing'] = stats.server_timing()
+        match = request.resolver_match
+        instrumentation.registry.record(
+            match.view_name if match else 'unresolved', stats
+        )
+        return response
+
+
+class ReplicaMiddleware:
+    """Чтение с реплик для безопасных запросов (см. `core.routers`).
+
+    После запроса, который что-то записал, клиент получает подписанную
+    куку на REPLICA_PIN_SECONDS секунд, и всё это время его запросы
+    читают из основной базы: так он сразу видит свой пост или
+    комментарий, даже если реплика ещё отстаёт. Стоит ставить сразу
+    после `InstrumentationMiddleware`, чтобы учесть запись сессии.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        pinned = request.get_signed_cookie(
+            PIN_COOKIE, default=None, max_age=settings.REPLICA_PIN_SECONDS
+        ) is not None
+        replicas = request.method in SAFE_METHODS and not pinned
+        with routers.reading(replicas):
+            response = self.get_response(request)
+            wrote = routers.wrote()
+        if wrote:
+            response.set_signed_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+def get_user(request):
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = auth.get_user(request)
+    return request._cached_user
+
+
+class AuthenticationMiddleware(BaseAuthenticationMiddleware):
+    """`request.user` из снимка в сессии (см. `core.auth`).
+
+    Заменяет `django.contrib.auth.middleware.AuthenticationMiddleware`
+    на том же месте в `MIDDLEWARE`: страницы, которым нужны только имя
+    и флаги пользователя, не читают `auth_user`.
+    """
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_user(request))
@@ -0,0 +1,90 @@
+"""Чтение с реплик базы.
+
+Реплики — алиасы из `settings.DATABASE_REPLICAS`, запись всегда идёт в
+`default`. Читать с реплики можно только внутри запроса, который
+разрешил `core.middleware.ReplicaMiddleware`: безопасный метод и никаких
+недавних записей этого клиента. Как только в запросе что-то пишется,
+дальнейшие чтения тоже идут в `default`, чтобы запрос видел свои же
+изменения. Вне запросов (команды, фоновые потоки) реплики не
+используются.
+
+Кеши, которые помечают изменения временем записи (фрагменты карточек,
+валидаторы условных GET), не должны запоминать то, что прочитано с
+реплики до того, как она получила изменение: см. `settled()`.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+
+PRIMARY = 'default'
+SYNCED_KEY = 'replicas:synced'
+
+_local = threading.local()
+
+
+@contextmanager
+def reading(replicas):
+    """Состояние маршрутизации на время запроса."""
+    _local.replicas = replicas
+    _local.wrote = False
+    try:
+        yield
+    finally:
+        _local.replicas = False
+
+
+def wrote():
+    """Была ли в текущем запросе запись в базу."""
+    return getattr(_local, 'wrote', False)
+
+
+def replica_read():
+    """Читает ли текущий запрос с реплик."""
+    return bool(
+        settings.DATABASE_REPLICAS
+        and getattr(_local, 'replicas', False)
+        and not wrote()
+    )
+
+
+def mark_synced(moment):
+    """Реплики содержат все изменения, сделанные до `moment`."""
+    cache.set(SYNCED_KEY, moment, None)
+
+
+def settled(moment):
+    """Видно ли текущему запросу изменение, сделанное в момент `moment`.
+
+    Реплики, которые обновляет `manage.py sync_replicas`, получают все
+    изменения до времени последнего копирования. Для настоящей
+    репликации, которая этого времени не отмечает, отставание считается
+    не больше REPLICA_PIN_SECONDS — как и для закрепления клиента.
+    """
+    if not replica_read():
+        return True
+    synced = cache.get(SYNCED_KEY)
+    if synced is None:
+        synced = time.time() - settings.REPLICA_PIN_SECONDS
+    return moment <= synced
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if replica_read():
+            return random.choice(settings.DATABASE_REPLICAS)
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        _local.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной базы, связи между ними допустимы.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
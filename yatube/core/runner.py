@@ -0,0 +1,36 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """Тесты выполняют фоновые задачи сразу, как письма — в locmem.
+
+    Кеш переносится во временный файл: тесты очищают его после себя и
+    не должны трогать кеш runserver, где лежат сессии и версии
+    фрагментов.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._tasks_eager = settings.TASKS_EAGER
+        settings.TASKS_EAGER = True
+        self._cache_dir = tempfile.mkdtemp()
+        self._caches = override_settings(CACHES={
+            alias: {**options, 'LOCATION': (
+                f'{self._cache_dir}/{alias}.sqlite3'
+                if options['BACKEND'] == 'core.cache.SQLiteCache'
+                else f'test-{alias}'
+            )}
+            for alias, options in settings.CACHES.items()
+        })
+        self._caches.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._caches.disable()
+        shutil.rmtree(self._cache_dir, ignore_errors=True)
+        settings.TASKS_EAGER = self._tasks_eager
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,153 @@
+"""Сессии в общем кеше с отложенным зеркалом в базе.
+
+Подключение: `SESSION_ENGINE = 'core.sessions'`. Сессия читается из
+кеша `SESSION_CACHE_ALIAS`; база (`django_session`) нужна только при
+промахе кеша. В отличие от `cached_db`, изменение сессии не пишется
+в базу сразу:
+
+* сохранение без настоящих изменений данных ничего не пишет;
+* новая сессия и вход или выход пользователя записываются в базу сразу;
+* прочие изменения попадают в базу не чаще раза в
+  SESSION_MIRROR_INTERVAL секунд — при следующем сохранении или
+  командой `manage.py sync_sessions`, которую стоит запускать по cron
+  с тем же интервалом.
+
+Зеркалом служит та же таблица `django_session`, что и у движка `db`,
+поэтому при переходе существующие сессии остаются действительными;
+`manage.py sync_sessions --warm` заранее загружает их в кеш.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import (
+    BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+)
+from django.contrib.sessions.backends import cached_db
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.utils import timezone
+
+KEY_PREFIX = 'core.sessions'
+# Сколько сессий sync() сверяет за одно чтение кеша.
+SYNC_CHUNK = 1000
+# Потеря этих ключей при вытеснении из кеша разлогинит пользователя.
+AUTH_KEYS = (SESSION_KEY, BACKEND_SESSION_KEY, HASH_SESSION_KEY)
+
+
+def _auth(data):
+    return [data.get(key) for key in AUTH_KEYS]
+
+
+class SessionStore(cached_db.SessionStore):
+    """Запись кеша — (данные, время зеркалирования, срок действия)."""
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._loaded = None
+        self._mirrored = None
+        self._mirrored_auth = None
+
+    def _dump(self, data):
+        return self.serializer().dumps(data)
+
+    def load(self):
+        try:
+            entry = self._cache.get(self.cache_key)
+        except Exception:
+            # Как в cached_db: memcached отвергает неверные ключи.
+            entry = None
+        if entry is None:
+            stored = self._get_session_from_db()
+            if stored is None:
+                return {}
+            entry = (
+                self.decode(stored.session_data), time.time(),
+                stored.expire_date,
+            )
+            self._cache.set(
+                self.cache_key, entry,
+                self.get_expiry_age(expiry=stored.expire_date),
+            )
+        data, self._mirrored, _ = entry
+        self._loaded = self._dump(data)
+        self._mirrored_auth = _auth(data)
+        return data
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        data = self._get_session(no_load=must_create)
+        dump = self._dump(data)
+        now = time.time()
+        mirror = (
+            must_create
+            or self._mirrored is None
+            or now - self._mirrored >= settings.SESSION_MIRROR_INTERVAL
+            or _auth(data) != self._mirrored_auth
+        )
+        if not mirror and dump == self._loaded:
+            return
+        expires = self.get_expiry_date()
+        if mirror:
+            # Минуя cached_db.save: кеш записывается ниже.
+            DBStore.save(self, must_create)
+            self._mirrored = now
+            self._mirrored_auth = _auth(data)
+            expires = self._expires
+        self._cache.set(
+            self.cache_key,
+            (data, self._mirrored, expires),
+            self.get_expiry_age(),
+        )
+        self._loaded = dump
+
+    def create_model_instance(self, data):
+        # Срок в зеркале и в кеше должен совпадать до микросекунды.
+        instance = super().create_model_instance(data)
+        self._expires = instance.expire_date
+        return instance
+
+
+def _sync_chunk(store, rows, warm):
+    entries = store._cache.get_many([KEY_PREFIX + row[0] for row in rows])
+    written = warmed = 0
+    for key, session_data, expire_date in rows:
+        entry = entries.get(KEY_PREFIX + key)
+        if entry is None:
+            if warm:
+                age = (expire_date - timezone.now()).total_seconds()
+                warmed += store._cache.add(
+                    KEY_PREFIX + key,
+                    (store.decode(session_data), time.time(), expire_date),
+                    max(int(age), 1),
+                )
+            continue
+        data, _, expires = entry
+        if expires != expire_date or data != store.decode(session_data):
+            written += store.model.objects.filter(session_key=key).update(
+                session_data=store.encode(data), expire_date=expires
+            )
+    return written, warmed
+
+
+def sync(warm=False, chunk=SYNC_CHUNK):
+    """Перенести в базу изменения сессий из кеша.
+
+    Данные в кеше сравниваются с данными в базе, поэтому запись кеша
+    не меняется и одновременные запросы ничего не теряют. При `warm`
+    сессии, которых нет в кеше, загружаются в него из базы.
+    Возвращает числа записанных в базу и загруженных в кеш сессий.
+    """
+    store = SessionStore()
+    rows = store.model.objects.filter(
+        expire_date__gt=timezone.now()
+    ).order_by('session_key').values_list(
+        'session_key', 'session_data', 'expire_date'
+    )
+    written = warmed = 0
+    batch = list(rows[:chunk])
+    while batch:
+        done = _sync_chunk(store, batch, warm)
+        written, warmed = written + done[0], warmed + done[1]
+        batch = list(rows.filter(session_key__gt=batch[-1][0])[:chunk])
+    return written, warmed
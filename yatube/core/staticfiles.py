@@ -0,0 +1,197 @@
+"""Статика с хешами в именах, заранее сжатая и отдаваемая без Django.
+
+`CompressedManifestStorage` при `collectstatic` добавляет к именам
+файлов хеш содержимого (как `ManifestStaticFilesStorage`) и кладёт рядом
+с текстовыми файлами сжатые копии `.gz` и, если установлен пакет
+`brotli`, `.br`. Копия сохраняется, только если она заметно меньше.
+
+`StaticFilesApplication` оборачивает WSGI-приложение и отдаёт файлы из
+STATIC_ROOT, не доходя до middleware и URLconf. Список файлов строится
+один раз при запуске, поэтому запрос к несуществующему пути не трогает
+диск и уходит приложению. Файлы с хешем в имени кешируются навсегда
+(`immutable`), остальные — на STATIC_MAX_AGE секунд. Сжатая копия
+выбирается по `Accept-Encoding`, для файлов с копиями ответ содержит
+`Vary: Accept-Encoding`. Файл передаётся через `wsgi.file_wrapper`
+сервера: gunicorn и uWSGI отправляют его через sendfile.
+"""
+import gzip
+import json
+import mimetypes
+import os
+from email.utils import formatdate
+from wsgiref.util import FileWrapper
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.utils.http import parse_etags
+
+try:
+    import brotli
+except ImportError:
+    # Без brotli собираются только gzip-копии.
+    brotli = None
+
+COMPRESSIBLE = (
+    '.css', '.js', '.svg', '.html', '.txt', '.json', '.xml', '.ico', '.map',
+)
+# Копия, которая выигрывает меньше 5%, не стоит заголовка Vary.
+MIN_RATIO = 0.95
+# Суффиксы копий в порядке предпочтения.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+FOREVER = 'public, max-age=31536000, immutable'
+STATIC_MAX_AGE = 60
+BLOCK_SIZE = 64 * 1024
+
+
+def compress(data):
+    """Сжатые варианты `data`: {суффикс: байты}."""
+    variants = {'.gz': gzip.compress(data, 9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data)
+    return {
+        suffix: packed for suffix, packed in variants.items()
+        if len(packed) < len(data) * MIN_RATIO
+    }
+
+
+class CompressedManifestStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        names = set()
+        for name, hashed_name, processed in super().post_process(
+            paths, dry_run, **options
+        ):
+            names.add(name)
+            if isinstance(hashed_name, str):
+                names.add(hashed_name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for name in sorted(names):
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE:
+                self.compress(name)
+
+    def compress(self, name):
+        path = self.path(name)
+        with open(path, 'rb') as source:
+            data = source.read()
+        for suffix in ('.gz', '.br'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        for suffix, packed in compress(data).items():
+            with open(path + suffix, 'wb') as target:
+                target.write(packed)
+
+
+def _accepted(header):
+    """Кодировки из Accept-Encoding, кроме запрещённых через q=0."""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        name, _, value = params.partition('=')
+        try:
+            if name.strip() == 'q' and float(value) <= 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticFile:
+    def __init__(self, path, immutable):
+        self.variants = []
+        for encoding, suffix in ENCODINGS + ((None, ''),):
+            if os.path.exists(path + suffix):
+                stat = os.stat(path + suffix)
+                tag = f'{stat.st_size:x}-{int(stat.st_mtime):x}'
+                if encoding is not None:
+                    tag += '-' + encoding
+                self.variants.append(
+                    (encoding, path + suffix, stat.st_size, f'"{tag}"')
+                )
+        content_type, _ = mimetypes.guess_type(path)
+        content_type = content_type or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type in (
+            'application/javascript', 'application/json', 'image/svg+xml',
+        ):
+            content_type += '; charset=utf-8'
+        self.headers = [
+            ('Content-Type', content_type),
+            ('Cache-Control', (
+                FOREVER if immutable else f'public, max-age={STATIC_MAX_AGE}'
+            )),
+            ('Last-Modified', formatdate(
+                os.stat(path).st_mtime, usegmt=True
+            )),
+        ]
+        if len(self.variants) > 1:
+            self.headers.append(('Vary', 'Accept-Encoding'))
+
+    def choose(self, accept_encoding):
+        accepted = _accepted(accept_encoding)
+        for variant in self.variants:
+            if variant[0] is None or variant[0] in accepted:
+                return variant
+
+    def serve(self, environ, start_response):
+        encoding, path, size, etag = self.choose(
+            environ.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        headers = self.headers + [('ETag', etag)]
+        if encoding is not None:
+            headers.append(('Content-Encoding', encoding))
+        if etag in parse_etags(environ.get('HTTP_IF_NONE_MATCH', '')):
+            start_response('304 Not Modified', headers)
+            return []
+        start_response(
+            '200 OK', headers + [('Content-Length', str(size))]
+        )
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        wrapper = environ.get('wsgi.file_wrapper', FileWrapper)
+        return wrapper(open(path, 'rb'), BLOCK_SIZE)
+
+
+def scan(root, prefix):
+    """Файлы каталога `root` по их адресам с префиксом `prefix`."""
+    manifest = os.path.join(root, 'staticfiles.json')
+    hashed = set()
+    if os.path.exists(manifest):
+        with open(manifest) as source:
+            hashed = set(json.load(source).get('paths', {}).values())
+    files = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            if path == manifest or os.path.splitext(name)[1] in (
+                '.gz', '.br'
+            ):
+                continue
+            relative = os.path.relpath(path, root).replace(os.sep, '/')
+            files[prefix + relative] = StaticFile(path, relative in hashed)
+    return files
+
+
+class StaticFilesApplication:
+    """WSGI-обёртка: отдаёт собранную статику, остальное — приложению."""
+
+    def __init__(self, application, root=None, prefix=None):
+        self.application = application
+        root = root or settings.STATIC_ROOT
+        prefix = prefix or settings.STATIC_URL
+        self.files = (
+            scan(root, prefix)
+            if root and prefix.startswith('/') and os.path.isdir(root)
+            else {}
+        )
+
+    def __call__(self, environ, start_response):
+        static = self.files.get(environ.get('PATH_INFO', ''))
+        if static is None:
+            return self.application(environ, start_response)
+        if environ['REQUEST_METHOD'] not in ('GET', 'HEAD'):
+            start_response(
+                '405 Method Not Allowed', [('Allow', 'GET, HEAD')]
+            )
+            return []
+        return static.serve(environ, start_response)
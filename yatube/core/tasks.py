@@ -0,0 +1,150 @@
+"""Очередь фоновых задач в базе данных.
+
+Функция становится задачей декоратором `task`, а `func.delay(...)`
+записывает её вызов в таблицу `Task` — в той же транзакции, что и
+изменения, ради которых она ставится, поэтому откаченный запрос не
+оставляет задач. Задачи выполняют процессы `manage.py run_workers`:
+каждый забирает задачу условным UPDATE, так что одну задачу не возьмут
+два воркера. Упавшая задача повторяется с экспоненциальной задержкой,
+после TASK_MAX_ATTEMPTS попыток остаётся в таблице со статусом
+`failed`. Успешные задачи удаляются.
+
+При TASKS_EAGER задачи выполняются сразу при вызове `delay`; так
+работают тесты (`core.runner.TestRunner`).
+"""
+import json
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+class Registered:
+    def __init__(self, func, max_attempts):
+        self.func = func
+        self.name = f'{func.__module__}.{func.__qualname__}'
+        self.max_attempts = max_attempts
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        """Поставить вызов в очередь; аргументы — значения JSON."""
+        if settings.TASKS_EAGER:
+            self.func(*args, **kwargs)
+            return None
+        return Task.objects.create(
+            name=self.name, arguments=json.dumps([args, kwargs])
+        )
+
+
+def task(max_attempts=None):
+    def register(func):
+        registered = Registered(
+            func, max_attempts or settings.TASK_MAX_ATTEMPTS
+        )
+        registry[registered.name] = registered
+        return registered
+    return register
+
+
+def lookup(name):
+    """Задача по имени; модуль задачи импортируется при необходимости."""
+    if name not in registry:
+        try:
+            import_string(name)
+        except ImportError:
+            return None
+    return registry.get(name)
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim(worker):
+    """Забрать самую раннюю готовую задачу или вернуть None."""
+    candidates = Task.objects.filter(
+        status=Task.PENDING, run_at__lte=timezone.now()
+    ).order_by('run_at').values_list('pk', flat=True)[:10]
+    for pk in candidates:
+        taken = Task.objects.filter(pk=pk, status=Task.PENDING).update(
+            status=Task.RUNNING, locked_by=worker, locked_at=timezone.now()
+        )
+        if taken:
+            return Task.objects.get(pk=pk)
+    return None
+
+
+def execute(task):
+    """Выполнить задачу; при ошибке запланировать повтор или отказаться."""
+    registered = lookup(task.name)
+    task.attempts += 1
+    try:
+        if registered is None:
+            raise LookupError(f'Задача {task.name} не зарегистрирована')
+        args, kwargs = json.loads(task.arguments)
+        registered.func(*args, **kwargs)
+    except Exception:
+        logger.exception('Задача %s (#%s) упала', task.name, task.pk)
+        task.last_error = traceback.format_exc()
+        task.locked_by, task.locked_at = '', None
+        if registered is None or task.attempts >= registered.max_attempts:
+            task.status = Task.FAILED
+        else:
+            task.status = Task.PENDING
+            task.run_at = timezone.now() + timedelta(
+                seconds=settings.TASK_RETRY_DELAY * 2 ** (task.attempts - 1)
+            )
+        task.save()
+        return False
+    task.delete()
+    return True
+
+
+def requeue_stale():
+    """Вернуть в очередь задачи воркеров, умерших посреди работы."""
+    return Task.objects.filter(
+        status=Task.RUNNING,
+        locked_at__lt=timezone.now() - timedelta(
+            seconds=settings.TASK_TIMEOUT
+        ),
+    ).update(status=Task.PENDING, locked_by='', locked_at=None)
+
+
+def work(burst=False, poll=1.0, should_stop=lambda: False):
+    """Цикл воркера; при `burst` выходит, когда очередь пуста.
+
+    Возвращает число выполненных задач.
+    """
+    worker = worker_name()
+    done = 0
+    requeued = 0
+    while not should_stop():
+        close_old_connections()
+        if time.monotonic() - requeued >= settings.TASK_TIMEOUT:
+            requeue_stale()
+            requeued = time.monotonic()
+        task = claim(worker)
+        if task is None:
+            if burst:
+                break
+            time.sleep(poll)
+            continue
+        done += execute(task)
+    close_old_connections()
+    return done
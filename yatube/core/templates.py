@@ -0,0 +1,23 @@
+from django.template.backends.django import DjangoTemplates, Template
+
+from . import instrumentation
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with instrumentation.template():
+            return super().render(context, request)
+
+
+class TimedTemplates(DjangoTemplates):
+    """Бэкенд Django-шаблонов, учитывающий время рендеринга в запросе."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(
+            super().from_string(template_code).template, self
+        )
+
+    def get_template(self, template_name):
+        return TimedTemplate(
+            super().get_template(template_name).template, self
+        )
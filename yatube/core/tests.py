@@ -1,5 +1,36 @@
-from django.test import TestCase, Client
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core import mail
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.db import connection
+from django.db.models import Count
+from django.test import (
+    Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+)
+from django.test.utils import CaptureQueriesContext
 from django.core.cache import cache
+from django.http import Http404
+from django.urls import reverse
+from django.utils import timezone
+
+from . import auth, sessions, tasks
+from .cache import SQLiteCache
+from .identity import identity
+from .middleware import PIN_COOKIE, ReplicaMiddleware
+from .models import Task
+from .routers import ReplicaRouter
+from .staticfiles import StaticFilesApplication
 
 
 class ViewTestClass(TestCase):
@@ -12,3 +43,459 @@ class ViewTestClass(TestCase):
     def test_error_page(self):
         response = self.guest_client.get('/nonexist-page/')
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class InstrumentationTest(TestCase):
+    def setUp(self):
+        self.guest_client = Client()
+        self.staff_client = Client()
+        self.staff_client.force_login(get_user_model().objects.create_user(
+            username='admin', is_staff=True
+        ))
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_server_timing_header(self):
+        """Ответ содержит SQL, шаблоны, кеш и общее время."""
+        response = self.guest_client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'queries', 'tpl;dur=', 'hits', 'total'):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, timing)
+
+    def test_metrics_are_for_staff_only(self):
+        """Метрики по представлениям видны только персоналу."""
+        self.guest_client.get(reverse('posts:index'))
+        response = self.guest_client.get(reverse('core:metrics'))
+        self.assertEqual(response.status_code, 302)
+        metrics = self.staff_client.get(reverse('core:metrics')).json()
+        index = metrics['posts:index']
+        self.assertGreaterEqual(index['count'], 1)
+        self.assertEqual(sum(index['histogram'].values()), index['count'])
+        self.assertGreater(index['mean_queries'], 0)
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_tests_use_temporary_cache(self):
+        """Тесты не очищают кеш, которым пользуется runserver."""
+        self.assertTrue(settings.CACHES['default']['LOCATION'].startswith(
+            tempfile.gettempdir()
+        ))
+
+    def test_values_are_shared_between_instances(self):
+        """Значения видны другому экземпляру, открывшему тот же файл."""
+        self.cache.set_many({'a': 1, 'b': [1, 2]})
+        other = self.make_cache()
+        self.assertEqual(
+            other.get_many(['a', 'b', 'c']),
+            {'a': 1, 'b': [1, 2]},
+        )
+        other.delete('a')
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_timeout(self):
+        """У каждого ключа своё время жизни."""
+        self.cache.set('short', 1, timeout=0.1)
+        self.cache.set('forever', 2, timeout=None)
+        time.sleep(0.2)
+        self.assertIsNone(self.cache.get('short'))
+        self.assertEqual(self.cache.get('forever'), 2)
+        self.assertTrue(self.cache.add('short', 3))
+        self.assertFalse(self.cache.add('forever', 3))
+
+    def test_incr(self):
+        self.cache.set('counter', 1)
+        self.assertEqual(self.cache.incr('counter', 5), 6)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_least_recently_used_entries_are_culled(self):
+        """При переполнении вытесняются давно не читанные записи."""
+        cache = self.make_cache(MAX_ENTRIES=60, CULL_FREQUENCY=2)
+        cache.set_many({f'old{i}': i for i in range(50)})
+        cache.set('recent', 'value')
+        cache.connection.execute(
+            "UPDATE cache SET accessed = 0 WHERE key LIKE '%old%'"
+        )
+        cache.set_many({f'new{i}': i for i in range(49)})
+        self.assertEqual(cache.get('recent'), 'value')
+        self.assertFalse(cache.get_many([f'old{i}' for i in range(50)]))
+        self.assertLessEqual(
+            cache.connection.execute('SELECT COUNT(*) FROM cache').fetchone(),
+            (60,),
+        )
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRoutingTest(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+
+    def run_request(self, request, write=False):
+        """Запрос через middleware; возвращает базы чтения и ответ."""
+        reads = []
+
+        def view(request):
+            reads.append(self.router.db_for_read(None))
+            if write:
+                self.router.db_for_write(None)
+                reads.append(self.router.db_for_read(None))
+            return HttpResponse()
+
+        response = ReplicaMiddleware(view)(request)
+        return reads, response
+
+    def test_safe_requests_read_from_replica(self):
+        reads, response = self.run_request(self.factory.get('/'))
+        self.assertEqual(reads, ['replica1'])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_reads_outside_requests_use_primary(self):
+        self.assertEqual(self.router.db_for_read(None), 'default')
+
+    def test_read_your_writes(self):
+        """После записи запрос и следующие запросы клиента читают основную."""
+        reads, response = self.run_request(
+            self.factory.post('/'), write=True
+        )
+        self.assertEqual(reads, ['default', 'default'])
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = response.cookies[PIN_COOKIE].value
+        self.assertEqual(self.run_request(request)[0], ['default'])
+        reads, response = self.run_request(
+            self.factory.get('/'), write=True
+        )
+        self.assertEqual(reads, ['replica1', 'default'])
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate('replica1', 'posts'))
+        self.assertTrue(self.router.allow_migrate('default', 'posts'))
+
+
+calls = []
+
+
+@tasks.task(max_attempts=2)
+def remember(value):
+    calls.append(value)
+
+
+@tasks.task(max_attempts=2)
+def explode():
+    raise RuntimeError('сбой')
+
+
+@override_settings(TASKS_EAGER=False)
+class TaskQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_delayed_task_runs_in_worker(self):
+        """delay только записывает задачу, воркер выполняет и удаляет её."""
+        remember.delay('значение')
+        self.assertEqual(calls, [])
+        self.assertEqual(tasks.work(burst=True), 1)
+        self.assertEqual(calls, ['значение'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_failed_task_is_retried_then_given_up(self):
+        """Упавшая задача повторяется позже, затем помечается failed."""
+        explode.delay()
+        with self.assertLogs('core.tasks', 'ERROR'):
+            tasks.work(burst=True)
+        task = Task.objects.get()
+        self.assertEqual((task.status, task.attempts), (Task.PENDING, 1))
+        self.assertGreater(task.run_at, timezone.now())
+        self.assertIn('сбой', task.last_error)
+        Task.objects.update(run_at=timezone.now())
+        with self.assertLogs('core.tasks', 'ERROR'):
+            tasks.work(burst=True)
+        self.assertEqual(Task.objects.get().status, Task.FAILED)
+
+    def test_stale_tasks_are_requeued(self):
+        """Задача умершего воркера возвращается в очередь."""
+        remember.delay(1)
+        Task.objects.update(
+            status=Task.RUNNING,
+            locked_at=timezone.now() - timezone.timedelta(days=1),
+        )
+        self.assertEqual(tasks.work(burst=True), 1)
+        self.assertEqual(calls, [1])
+
+    @override_settings(
+        EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+        QUEUED_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    )
+    def test_email_is_sent_by_worker(self):
+        message = mail.EmailMultiAlternatives(
+            'Тема', 'Текст', 'from@yatube.ru', ['to@yatube.ru'],
+            reply_to=['reply@yatube.ru'], headers={'X-Tag': 'test'},
+        )
+        message.attach_alternative('<p>Текст</p>', 'text/html')
+        message.attach('data.bin', b'\x00\xff', 'application/octet-stream')
+        message.send()
+        self.assertEqual(mail.outbox, [])
+        arguments = Task.objects.get().arguments
+        self.assertIsInstance(json.loads(arguments), list)
+        tasks.work(burst=True)
+        sent, = mail.outbox
+        for field in ('subject', 'body', 'to', 'reply_to', 'extra_headers',
+                      'alternatives', 'attachments'):
+            with self.subTest(field=field):
+                self.assertEqual(
+                    getattr(sent, field), getattr(message, field)
+                )
+
+
+class IdentityMapTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='reader')
+
+    def setUp(self):
+        self.request = RequestFactory().get('/')
+        self.request.user = self.user
+
+    def test_objects_are_loaded_once(self):
+        """Повторный поиск по любому уникальному полю не делает запросов."""
+        User = get_user_model()
+        other = User.objects.create_user(username='author')
+        loader = identity(self.request)
+        with self.assertNumQueries(0):
+            self.assertIs(loader.get(User, username='reader'), self.user)
+        with self.assertNumQueries(1):
+            found = loader.get(User, username='author')
+        with self.assertNumQueries(0):
+            self.assertIs(loader.get(User, pk=str(other.pk)), found)
+            self.assertIs(identity(self.request), loader)
+
+    def test_missing_object(self):
+        with self.assertRaises(Http404):
+            identity(self.request).get_or_404(
+                get_user_model(), username='nobody'
+            )
+
+    def test_filtered_querysets_are_rejected(self):
+        """Условия QuerySet не обходятся найденным в карте объектом."""
+        User = get_user_model()
+        loader = identity(self.request)
+        for queryset in (
+            User.objects.filter(is_active=False),
+            User.objects.annotate(total=Count('pk')),
+            User.objects.all()[:1],
+        ):
+            with self.subTest(query=str(queryset.query)):
+                with self.assertRaises(ValueError):
+                    loader.get(queryset, username='reader')
+        with self.assertNumQueries(0):
+            found = loader.get(
+                User.objects.order_by('username'), username='reader'
+            )
+        self.assertIs(found, self.user)
+
+
+class SessionStoreTest(TestCase):
+    def tearDown(self):
+        cache.clear()
+
+    def stored(self, key):
+        return DBStore(key).load()
+
+    def test_only_real_changes_are_written(self):
+        """Пустое сохранение ничего не пишет, изменение идёт в кеш."""
+        session = sessions.SessionStore()
+        session['theme'] = 'dark'
+        session.save()
+        session = sessions.SessionStore(session.session_key)
+        session['theme'] = 'dark'
+        with self.assertNumQueries(0):
+            session.save()
+        session['theme'] = 'light'
+        with self.assertNumQueries(0):
+            session.save()
+        self.assertEqual(
+            sessions.SessionStore(session.session_key)['theme'], 'light'
+        )
+        self.assertEqual(self.stored(session.session_key)['theme'], 'dark')
+        self.assertEqual(sessions.sync(), (1, 0))
+        self.assertEqual(self.stored(session.session_key)['theme'], 'light')
+        self.assertEqual(sessions.sync(), (0, 0))
+
+    def test_login_is_written_immediately(self):
+        client = Client()
+        client.force_login(
+            get_user_model().objects.create_user(username='reader')
+        )
+        cache.clear()
+        response = client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_sessions_of_db_engine_are_kept(self):
+        """Сессии движка db читаются и загружаются в кеш командой."""
+        old = DBStore()
+        old['theme'] = 'dark'
+        old.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                sessions.SessionStore(old.session_key)['theme'], 'dark'
+            )
+        cache.clear()
+        self.assertEqual(sessions.sync(warm=True), (0, 1))
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                sessions.SessionStore(old.session_key)['theme'], 'dark'
+            )
+
+
+class UserSnapshotTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='reader', password='pass'
+        )
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.url = reverse('posts:follow_index')
+
+    def tearDown(self):
+        cache.clear()
+
+    def user_queries(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(self.url)
+        return response, [
+            query['sql'] for query in captured
+            if 'FROM "auth_user" WHERE' in query['sql']
+        ]
+
+    def test_snapshot_replaces_user_query(self):
+        """После первого запроса пользователь берётся из снимка."""
+        _, queries = self.user_queries()
+        self.assertEqual(len(queries), 1)
+        response, queries = self.user_queries()
+        self.assertEqual(queries, [])
+        self.assertEqual(response.context['user'].username, 'reader')
+        self.assertIn(auth.SNAPSHOT_KEY, self.client.session)
+
+    def test_saving_user_invalidates_snapshot(self):
+        self.user_queries()
+        self.user.first_name = 'Иван'
+        self.user.save()
+        response, queries = self.user_queries()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.context['user'].first_name, 'Иван')
+
+    def test_password_change_logs_out(self):
+        self.user_queries()
+        self.user.set_password('other')
+        self.user.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+
+    def test_bulk_deactivation_logs_out(self):
+        self.user_queries()
+        auth.update_users(
+            get_user_model().objects.filter(pk=self.user.pk),
+            is_active=False,
+        )
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+
+    def test_snapshot_expires(self):
+        """Изменение в обход update_users видно через MAX_AGE секунд."""
+        self.user_queries()
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            first_name='Иван'
+        )
+        later = time.time() + auth.MAX_AGE + 1
+        with mock.patch('django.core.signing.time.time', return_value=later):
+            response, queries = self.user_queries()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.context['user'].first_name, 'Иван')
+
+    def test_staff_is_not_snapshotted(self):
+        """Права сотрудника проверяются по базе на каждый запрос."""
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            is_staff=True
+        )
+        self.user_queries()
+        self.assertNotIn(auth.SNAPSHOT_KEY, self.client.session)
+        _, queries = self.user_queries()
+        self.assertEqual(len(queries), 1)
+
+
+class StaticFilesTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = tempfile.mkdtemp()
+        with override_settings(
+            STATIC_ROOT=cls.root,
+            STATICFILES_STORAGE='core.staticfiles.CompressedManifestStorage',
+        ):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            cls.hashed = staticfiles_storage.url('css/bootstrap.min.css')
+        cls.application = StaticFilesApplication(
+            lambda environ, start_response: [b'django'], cls.root, '/static/'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.root, ignore_errors=True)
+        super().tearDownClass()
+
+    def get(self, path, **headers):
+        environ = RequestFactory().get(path, **headers).environ
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = status
+            response['headers'] = dict(headers)
+
+        body = b''.join(self.application(environ, start_response))
+        return response.get('status'), response.get('headers'), body
+
+    def test_hashed_file_is_served_compressed(self):
+        """Хешированный файл отдаётся сжатым и кешируется навсегда."""
+        self.assertNotEqual(self.hashed, '/static/css/bootstrap.min.css')
+        status, headers, body = self.get(
+            self.hashed, HTTP_ACCEPT_ENCODING='gzip, deflate'
+        )
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(headers['Vary'], 'Accept-Encoding')
+        self.assertIn('immutable', headers['Cache-Control'])
+        self.assertEqual(int(headers['Content-Length']), len(body))
+        with open(os.path.join(
+            self.root, self.hashed[len('/static/'):]
+        ), 'rb') as source:
+            self.assertEqual(gzip.decompress(body), source.read())
+
+    def test_identity_and_not_modified(self):
+        status, headers, body = self.get(
+            self.hashed, HTTP_ACCEPT_ENCODING='gzip;q=0'
+        )
+        self.assertNotIn('Content-Encoding', headers)
+        self.assertEqual(headers['Vary'], 'Accept-Encoding')
+        status, _, body = self.get(
+            self.hashed, HTTP_IF_NONE_MATCH=headers['ETag']
+        )
+        self.assertEqual((status, body), ('304 Not Modified', b''))
+
+    def test_unhashed_and_unknown_paths(self):
+        _, headers, _ = self.get('/static/css/bootstrap.min.css')
+        self.assertNotIn('immutable', headers['Cache-Control'])
+        self.assertEqual(self.get('/static/missing.css')[2], b'django')
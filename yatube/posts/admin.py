@@ -1,9 +1,64 @@
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
 
+from . import counters, search
+from .constants import ADMIN_COUNT_LIMIT
 from .models import Group, Post
+from .utils import EstimatedPaginator
 
 
-class PostAdmin(admin.ModelAdmin):
+class JoinedAutocomplete(AutocompleteSelect):
+    """Автокомплит, который подписывает выбранное значение без запроса.
+
+    Обычный виджет ищет выбранный объект отдельным запросом, то есть
+    по запросу на строку в list_editable. Форма списка передаёт сюда
+    объект, уже присоединённый через list_select_related.
+    """
+    selected = None
+
+    def optgroups(self, name, value, attr=None):
+        selected = self.selected
+        if selected is None or [str(v) for v in value] != [str(selected.pk)]:
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        options.append(self.create_option(
+            name,
+            selected.pk,
+            self.choices.field.label_from_instance(selected),
+            True,
+            len(options),
+        ))
+        return [(None, options, 0)]
+
+
+class ScaleAdmin(admin.ModelAdmin):
+    """Список без COUNT(*) по всей таблице.
+
+    Общее число строк берётся из `estimated_count`, а в отфильтрованном
+    списке считается не больше ADMIN_COUNT_LIMIT строк: дальние страницы
+    открываются по номеру (`?p=`), но не попадают в навигацию.
+    """
+    show_full_result_count = False
+
+    def estimated_count(self):
+        return None
+
+    def get_paginator(self, request, queryset, per_page, orphans=0,
+                      allow_empty_first_page=True):
+        count = None
+        if not queryset.query.where:
+            count = self.estimated_count()
+        if count is None:
+            count = queryset.order_by()[:ADMIN_COUNT_LIMIT].count()
+        return EstimatedPaginator(
+            queryset, per_page, count, orphans=orphans,
+            allow_empty_first_page=allow_empty_first_page,
+        )
+
+
+class PostAdmin(ScaleAdmin):
     list_display = (
         'pk',
         'text',
@@ -11,20 +66,50 @@ class PostAdmin(admin.ModelAdmin):
         'author',
         'group'
     )
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
+    # Фильтры идут по индексам (pub_date, id) и (group, pub_date, id).
     list_filter = ('pub_date', 'group',)
     list_editable = ('group',)
+    autocomplete_fields = ('author', 'group')
     empty_value_display = '-пусто-'
 
+    def estimated_count(self):
+        return counters.posts_count()
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return search.filter_posts(queryset, search_term), False
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.autocomplete_fields:
+            kwargs['widget'] = JoinedAutocomplete(
+                db_field.remote_field, self.admin_site
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changelist_form(self, request, **kwargs):
+        base = super().get_changelist_form(request, **kwargs)
+
+        class ChangelistForm(base):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                widget = self.fields['group'].widget
+                widget = getattr(widget, 'widget', widget)
+                if self.instance.group_id is not None:
+                    widget.selected = self.instance.group
+
+        return ChangelistForm
+
 
-class GroupAdmin(admin.ModelAdmin):
+class GroupAdmin(ScaleAdmin):
     list_display = (
         'slug',
         'title',
         'description'
     )
-    search_fields = ('title',)
-    list_filter = ('title', 'slug',)
+    search_fields = ('title', 'slug')
     empty_value_display = '-пусто-'
 
 
@@ -0,0 +1,161 @@
+"""Условные GET-запросы (ETag/Last-Modified) для страниц постов.
+
+Для каждой области данных (лента, группа, автор, пост, подписки
+читателя) в кеше хранится время последнего изменения; его обновляют
+сигналы (`posts.signals`). Валидаторы страницы строятся из этих времён,
+адреса страницы (номер страницы или курсор входят в него) и
+пользователя, поэтому для листингов не нужен ни один SQL-запрос, а
+неизменившаяся страница отдаётся как 304 без рендеринга шаблона.
+
+Время самой публикации (`Post.pub_date`, `Comment.created`) не видит
+правок и удалений, поэтому и используется время изменения. Если
+значение вытеснено из кеша, область считается изменённой только что:
+клиент получит полную страницу, но никогда — устаревшую. По той же
+причине страница, прочитанная с реплики, которая ещё не получила
+последнее изменение, отдаётся без валидаторов (`core.routers.settled`).
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.views.decorators.http import condition
+
+from core import routers
+from core.identity import identity
+
+from .models import Post
+
+POSTS = 'posts'
+# Имена пользователей и названия групп видны на страницах чужих областей.
+USERS = 'users'
+GROUPS = 'groups'
+
+
+def scope_key(scope):
+    # Слаги и имена пользователей могут содержать не-ASCII символы.
+    return 'changed:' + hashlib.md5(scope.encode()).hexdigest()
+
+
+def group_scope(slug):
+    return f'group:{slug}'
+
+
+def author_scope(username):
+    return f'author:{username}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def follows_scope(user_id):
+    return f'follows:{user_id}'
+
+
+def touch(*scopes):
+    """Отметить изменение данных в областях `scopes`."""
+    now = time.time()
+    cache.set_many({scope_key(scope): now for scope in scopes}, None)
+
+
+def touch_post(post_id):
+    """Отметить изменение поста на всех страницах, где видна его карточка."""
+    row = Post.objects.filter(pk=post_id).values_list(
+        'author__username', 'group__slug'
+    ).first()
+    if row is None:
+        return
+    username, slug = row
+    touch(
+        POSTS,
+        post_scope(post_id),
+        author_scope(username),
+        *([group_scope(slug)] if slug is not None else []),
+    )
+
+
+def changed(scopes):
+    """Время последнего изменения в любой из областей."""
+    keys = [scope_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    missing = set(keys) - set(found)
+    if missing:
+        now = time.time()
+        cache.set_many(dict.fromkeys(missing, now), None)
+        found.update(dict.fromkeys(missing, now))
+    return max(found.values())
+
+
+def _validators(request, scopes):
+    # condition() вызывает функции ETag и Last-Modified по отдельности.
+    if not hasattr(request, '_validators'):
+        moment = changed(scopes)
+        if not routers.settled(moment):
+            # Реплика может отдать данные старше валидаторов.
+            request._validators = (None, None)
+            return request._validators
+        etag = hashlib.md5(
+            f'{moment}:{request.get_full_path()}:{request.user.pk}'.encode()
+        ).hexdigest()
+        request._validators = (
+            etag, datetime.fromtimestamp(moment, timezone.utc)
+        )
+    return request._validators
+
+
+def validated(scopes):
+    """Декоратор представления; `scopes(request, **kwargs)` — его области."""
+    def etag(request, *args, **kwargs):
+        found = scopes(request, **kwargs)
+        return _validators(request, found)[0] if found else None
+
+    def last_modified(request, *args, **kwargs):
+        found = scopes(request, **kwargs)
+        return _validators(request, found)[1] if found else None
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def index_scopes(request):
+    return [POSTS, USERS, GROUPS]
+
+
+def groups_scopes(request):
+    return [GROUPS]
+
+
+def group_scopes(request, slug):
+    return [group_scope(slug), USERS]
+
+
+def profile_scopes(request, username):
+    return [
+        author_scope(username),
+        USERS,
+        GROUPS,
+        follows_scope(request.user.pk),
+    ]
+
+
+def post_scopes(request, post_id):
+    """Пост, его автор и группа: один запрос по первичному ключу.
+
+    Пост остаётся в карте идентичности запроса, и представлению не
+    нужно читать его снова.
+    """
+    if not hasattr(request, '_post_scopes'):
+        request._post_scopes = None
+        try:
+            post = identity(request).get(
+                Post.objects.select_related('author', 'group'), id=post_id
+            )
+        except Post.DoesNotExist:
+            return None
+        request._post_scopes = [
+            post_scope(post_id), author_scope(post.author.username), USERS,
+            GROUPS,
+        ]
+        if post.group_id is not None:
+            request._post_scopes.append(group_scope(post.group.slug))
+    return request._post_scopes
@@ -1 +1,16 @@
 POSTS_PER_PAGE = 10
+KEYSET_PAGINATION = False
+KEYSET_ORDERING = ('-pub_date', '-id')
+COMMENTS_PER_PAGE = 50
+COMMENT_ORDERING = ('-created', '-id')
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_BACKFILL = 500
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+THUMBNAIL_SIZES = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+SEARCH_LIMIT = 1000
+# Совпадение в комментарии весит меньше совпадения в тексте поста.
+SEARCH_COMMENT_WEIGHT = 0.5
+# Сколько строк админка считает точно в отфильтрованном списке.
+ADMIN_COUNT_LIMIT = 10_000
@@ -0,0 +1,171 @@
+"""Денормализованные счётчики постов, комментариев и подписчиков.
+
+Значения хранятся в модели `Counter` и меняются сигналами при сохранении
+и удалении `Post` и при изменении подписок (см. `posts.signals`). Число
+комментариев хранится прямо в строке поста (`Post.comment_count`),
+чтобы листинги получали его без отдельного запроса. Отсутствующий
+счётчик считается один раз через `COUNT(*)` и сохраняется, поэтому
+таблицу можно не заполнять заранее. Расхождения, накопленные, например,
+массовыми операциями в обход сигналов, исправляет команда
+`manage.py reconcile_counters`.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Counter, Follow, Post
+
+POSTS = 'posts'
+
+
+def author_key(author_id):
+    return f'posts:author:{author_id}'
+
+
+def group_key(group_id):
+    return f'posts:group:{group_id}'
+
+
+def followers_key(author_id):
+    return f'followers:author:{author_id}'
+
+
+def source(name):
+    """Queryset, по которому считается счётчик `name`."""
+    if name == POSTS:
+        return Post.objects.all()
+    kind, _, pk = name.rpartition(':')
+    if kind == 'posts:author':
+        return Post.objects.filter(author_id=pk)
+    if kind == 'posts:group':
+        return Post.objects.filter(group_id=pk)
+    if kind == 'followers:author':
+        return Follow.objects.filter(author_id=pk)
+    raise KeyError(name)
+
+
+def get_many(names):
+    """Значения счётчиков одним запросом, недостающие досчитываются."""
+    values = dict(
+        Counter.objects.filter(name__in=names).values_list('name', 'value')
+    )
+    for name in set(names) - set(values):
+        values[name] = _initialize(name)
+    return values
+
+
+def get(name):
+    return get_many([name])[name]
+
+
+def _initialize(name):
+    value = source(name).count()
+    try:
+        with transaction.atomic():
+            Counter.objects.create(name=name, value=value)
+    except IntegrityError:
+        return Counter.objects.get(name=name).value
+    return value
+
+
+def change(name, delta):
+    """Изменить счётчик, если он уже заведён.
+
+    Незаведённый счётчик не трогаем: при первом чтении он будет посчитан
+    целиком, уже с учётом этого изменения.
+    """
+    Counter.objects.filter(name=name).update(value=F('value') + delta)
+
+
+def forget(name):
+    Counter.objects.filter(name=name).delete()
+
+
+def posts_count():
+    return get(POSTS)
+
+
+def author_posts_count(author):
+    return get(author_key(author.pk))
+
+
+def group_posts_count(group):
+    return get(group_key(group.pk))
+
+
+def change_comments(post_id, delta):
+    # Счётчик мог разойтись с таблицей (bulk_create в обход сигналов),
+    # а отрицательное значение нарушит CHECK положительного поля.
+    Post.objects.filter(pk=post_id).update(
+        comment_count=Greatest(F('comment_count') + delta, 0)
+    )
+
+
+def followers_count(author_id):
+    return get(followers_key(author_id))
+
+
+def expected():
+    """Точные значения всех счётчиков, посчитанные агрегатами."""
+    values = {POSTS: Post.objects.count()}
+    grouped = (
+        ('author', author_key, Post.objects),
+        ('group', group_key, Post.objects.exclude(group=None)),
+        ('author', followers_key, Follow.objects),
+    )
+    for field, key, queryset in grouped:
+        rows = (
+            queryset.order_by().values_list(field).annotate(total=Count('pk'))
+        )
+        values.update((key(pk), total) for pk, total in rows)
+    return values
+
+
+@transaction.atomic
+def reconcile():
+    """Привести таблицу счётчиков и `Post.comment_count` к точным значениям.
+
+    Возвращает число исправленных, созданных и удалённых счётчиков.
+    """
+    values = expected()
+    stored = dict(Counter.objects.values_list('name', 'value'))
+    fixed = [
+        Counter(name=name, value=value)
+        for name, value in values.items()
+        if name in stored and stored[name] != value
+    ]
+    Counter.objects.bulk_update(fixed, ['value'], batch_size=500)
+    created = [
+        Counter(name=name, value=value)
+        for name, value in values.items()
+        if name not in stored
+    ]
+    Counter.objects.bulk_create(created, batch_size=500)
+    stale = [
+        name for name, value in stored.items()
+        if name not in values and value != 0
+    ]
+    for start in range(0, len(stale), 500):
+        Counter.objects.filter(name__in=stale[start:start + 500]).delete()
+    return len(fixed) + reconcile_comments(), len(created), len(stale)
+
+
+def comment_count_expression():
+    return Coalesce(Subquery(
+        Comment.objects.filter(post=OuterRef('pk')).order_by()
+        .values('post').annotate(total=Count('pk')).values('total'),
+        output_field=IntegerField(),
+    ), 0)
+
+
+def reconcile_comments():
+    """Исправить `Post.comment_count`; вернуть число исправленных постов."""
+    stale = list(
+        Post.objects.annotate(actual=comment_count_expression())
+        .exclude(comment_count=F('actual')).values_list('pk', flat=True)
+    )
+    for start in range(0, len(stale), 500):
+        Post.objects.filter(pk__in=stale[start:start + 500]).update(
+            comment_count=comment_count_expression()
+        )
+    return len(stale)
@@ -0,0 +1,123 @@
+"""Выгрузка и загрузка всех данных Yatube построчно (NDJSON).
+
+Каждая строка — `{"model": "posts.post", "fields": {...}}`, где среди
+полей есть первичный ключ, а внешние ключи записаны как `author_id`.
+Таблицы читаются порциями по первичному ключу через `iterator()`, так
+что память не зависит от объёма данных, а порядок моделей в `MODELS`
+гарантирует, что строка идёт после тех, на которые ссылается.
+
+В выгрузку входят только исходные данные. Ленты подписок, счётчики и
+поисковый индекс строятся заново после загрузки, права и группы
+доступа пользователей не переносятся. Картинки постов не
+копируются: в `Post.image` хранится путь в хранилище медиафайлов, и
+файлы нужно перенести вместе с каталогом MEDIA_ROOT.
+"""
+import json
+from itertools import groupby, islice
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+
+from .models import Comment, Follow, Group, Post
+from .utils import explicit_dates
+
+User = get_user_model()
+
+MODELS = (User, Group, Post, Comment, Follow)
+CHUNK = 2000
+
+
+class InvalidRecord(ValueError):
+    pass
+
+
+def label(model):
+    return model._meta.label_lower
+
+
+def _encode(value):
+    # Даты пишутся полностью, с микросекундами.
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} не сериализуется')
+
+
+def rows(model, chunk=CHUNK):
+    """Строки таблицы словарями `attname -> значение`, порциями по pk."""
+    names = [field.attname for field in model._meta.concrete_fields]
+    queryset = model.objects.order_by('pk').values(*names)
+    last = None
+    while True:
+        batch = queryset if last is None else queryset.filter(pk__gt=last)
+        count = 0
+        for row in batch[:chunk].iterator():
+            count += 1
+            last = row[model._meta.pk.attname]
+            yield row
+        if count < chunk:
+            return
+
+
+def dump(output, chunk=CHUNK):
+    """Записать все модели в `output`; вернуть число строк по моделям."""
+    counts = {}
+    for model in MODELS:
+        name = label(model)
+        counts[name] = 0
+        for row in rows(model, chunk):
+            output.write(json.dumps(
+                {'model': name, 'fields': row},
+                default=_encode,
+                ensure_ascii=False,
+            ) + '\n')
+            counts[name] += 1
+    return counts
+
+
+def images(chunk=CHUNK):
+    """Пути картинок постов."""
+    for row in rows(Post, chunk):
+        if row['image']:
+            yield row['image']
+
+
+def missing_media(names):
+    return [name for name in names if not default_storage.exists(name)]
+
+
+def _instance(models, line):
+    try:
+        record = json.loads(line)
+        model = models[record['model']]
+        fields = record['fields']
+        return model(**{
+            field.attname: field.to_python(fields[field.attname])
+            for field in model._meta.concrete_fields
+            if field.attname in fields
+        })
+    except (ValueError, KeyError, TypeError) as error:
+        raise InvalidRecord(line[:200]) from error
+
+
+def load(lines, batch_size=CHUNK):
+    """Создать объекты из строк выгрузки пакетами bulk_create.
+
+    Сигналы при этом не срабатывают. Вызывающий код отвечает за
+    транзакцию и проверку ограничений. Возвращает число строк по моделям.
+    """
+    models = {label(model): model for model in MODELS}
+    counts = dict.fromkeys(models, 0)
+    instances = (_instance(models, line) for line in lines if line.strip())
+    with explicit_dates(
+        Post._meta.get_field('pub_date'),
+        Comment._meta.get_field('created'),
+    ):
+        while True:
+            batch = list(islice(instances, batch_size))
+            if not batch:
+                return counts
+            # В выгрузке модели идут подряд, пакет делится на группы.
+            for model, objects in groupby(batch, key=type):
+                objects = list(objects)
+                model.objects.bulk_create(objects)
+                counts[label(model)] += len(objects)
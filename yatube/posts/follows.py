@@ -0,0 +1,21 @@
+"""Проверки подписок для страниц с многими авторами."""
+from .models import Follow
+
+
+def is_following(user, authors):
+    """Множество id авторов из `authors`, на которых подписан `user`.
+
+    `authors` — пользователи или их id. Проверка выполняется одним
+    запросом по уникальному индексу `(user, author)`, поэтому её можно
+    вызывать один раз на страницу, а не для каждого поста.
+    """
+    if not user.is_authenticated:
+        return set()
+    author_ids = {getattr(author, 'pk', author) for author in authors}
+    if not author_ids:
+        return set()
+    return set(
+        Follow.objects.filter(
+            user=user, author_id__in=author_ids
+        ).values_list('author_id', flat=True)
+    )
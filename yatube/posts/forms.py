@@ -1,6 +1,6 @@
 from django import forms
 
-from .models import Post, Comment, Follow
+from .models import Post, Comment
 
 
 class PostForm(forms.ModelForm):
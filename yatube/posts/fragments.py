@@ -0,0 +1,91 @@
+"""Кеш отрендеренных карточек постов для листингов.
+
+Ключ фрагмента включает версии поста, его автора и группы. Версия — это
+случайный токен в кеше, который меняется сигналами при сохранении и
+удалении `Post`, `User` и `Group` (см. `posts.signals`), поэтому
+устаревший фрагмент никогда не будет прочитан и просто вытеснится.
+Страница собирается за два обращения к кешу: за версиями и за
+фрагментами.
+
+Версия помнит время своего создания. Карточка, прочитанная с реплики,
+которая ещё не получила изменение новее версии, рендерится, но в кеш
+не попадает: иначе старые данные жили бы под новой версией.
+"""
+import math
+import time
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from core import routers
+
+from .constants import FRAGMENT_CACHE_TIMEOUT
+
+TEMPLATE = 'posts/includes/post_card.html'
+
+
+def version_key(kind, pk):
+    return f'fragment-version:{kind}:{pk}'
+
+
+def new_version():
+    return f'{uuid4().hex[:8]}-{math.ceil(time.time())}'
+
+
+def created(version):
+    """Время создания версии; у версий старого формата его нет."""
+    _, _, moment = version.partition('-')
+    return int(moment) if moment.isdigit() else 0
+
+
+def bump(kind, pk):
+    """Сделать недействительными все фрагменты объекта."""
+    cache.set(version_key(kind, pk), new_version(), FRAGMENT_CACHE_TIMEOUT)
+
+
+def _version_keys(post):
+    keys = [version_key('post', post.pk), version_key('user', post.author_id)]
+    if post.group_id is not None:
+        keys.append(version_key('group', post.group_id))
+    return keys
+
+
+def _versions(posts):
+    keys = {key for post in posts for key in _version_keys(post)}
+    versions = cache.get_many(keys)
+    missing = {key: new_version() for key in keys - set(versions)}
+    if missing:
+        cache.set_many(missing, FRAGMENT_CACHE_TIMEOUT)
+        versions.update(missing)
+    return {
+        post.pk: [versions[key] for key in _version_keys(post)]
+        for post in posts
+    }
+
+
+def render_posts(posts, variant):
+    """HTML карточек постов, взятые из кеша или отрендеренные заново."""
+    posts = list(posts)
+    versions = _versions(posts)
+    keys = {
+        post.pk: f'fragment:{variant}:{post.pk}:{".".join(versions[post.pk])}'
+        for post in posts
+    }
+    fragments = cache.get_many(keys.values())
+    rendered = {}
+    template = None
+    for post in posts:
+        key = keys[post.pk]
+        if key not in fragments:
+            # Шаблон карточки загружается один раз на страницу.
+            template = template or get_template(TEMPLATE)
+            fragments[key] = template.render(
+                {'post': post, 'variant': variant}
+            )
+            if routers.settled(max(map(created, versions[post.pk]))):
+                rendered[key] = fragments[key]
+    if rendered:
+        cache.set_many(rendered, FRAGMENT_CACHE_TIMEOUT)
+    return [mark_safe(fragments[keys[post.pk]]) for post in posts]
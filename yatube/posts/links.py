@@ -0,0 +1,42 @@
+"""Адреса постов, групп и профилей без `reverse` на каждую ссылку.
+
+`reverse` на каждый вызов заново подбирает шаблон URL и проверяет
+аргументы, а в листинге ссылок по три на карточку. Здесь маршрут
+разворачивается один раз с меткой вместо аргумента, и дальше адрес
+собирается подстановкой значения в готовую строку. Кеш учитывает
+префикс скрипта и URLconf, поэтому результат совпадает с `reverse`.
+"""
+from functools import lru_cache
+from urllib.parse import quote
+
+from django.urls import get_script_prefix, get_urlconf, reverse
+
+# Подходит под конвертеры int, slug и str.
+MARKER = '987654321'
+# Как в `reverse`: эти символы в пути не экранируются.
+SAFE = "!$&'()*+,;=/~:@"
+
+
+@lru_cache(maxsize=None)
+def _parts(name, kwarg, prefix, urlconf):
+    head, tail = reverse(
+        name, kwargs={kwarg: MARKER}, urlconf=urlconf
+    ).split(MARKER)
+    return head, tail
+
+
+def build(name, kwarg, value):
+    head, tail = _parts(name, kwarg, get_script_prefix(), get_urlconf())
+    return head + quote(str(value), safe=SAFE) + tail
+
+
+def post_url(post_id):
+    return build('posts:post_detail', 'post_id', post_id)
+
+
+def group_url(slug):
+    return build('posts:group_list', 'slug', slug)
+
+
+def profile_url(username):
+    return build('posts:profile', 'username', username)
@@ -0,0 +1,346 @@
+import json
+import math
+import statistics
+import subprocess
+import sys
+import time
+from io import BytesIO
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signals
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+from posts import urls
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+# Метрики, по которым сравниваются прогоны: рост больше порога — регрессия.
+COMPARED = ('p95', 'queries')
+
+
+class Rollback(Exception):
+    pass
+
+
+def percentile(timings, fraction):
+    """Перцентиль по ближайшему рангу (statistics.quantiles нет в 3.7)."""
+    ordered = sorted(timings)
+    rank = math.ceil(fraction * len(ordered)) - 1
+    return ordered[min(max(rank, 0), len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный замер всех маршрутов posts/urls.py: запросы идут '
+        'внутри процесса через WSGI-приложение yatube.wsgi. Для каждого '
+        'сценария выводятся p50/p95/p99, запросов в секунду и число '
+        'SQL-запросов. Все изменения данных откатываются в конце.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Сколько запросов выполнять в каждом сценарии.',
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=10,
+            help='Сколько запросов сделать до замера.',
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кеш перед каждым запросом.',
+        )
+        parser.add_argument(
+            '--output', help='Сохранить результаты в JSON-файл.',
+        )
+        parser.add_argument(
+            '--compare', help='Сравнить с результатами из JSON-файла.',
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=10.0,
+            help='Допустимый рост p95 и числа запросов, в процентах.',
+        )
+
+    def handle(self, *args, **options):
+        from yatube.wsgi import application
+
+        self.application = application
+        self.options = options
+        # Как и тестовый клиент, не даём обработчику закрывать соединение:
+        # иначе замер не сможет откатить транзакцию.
+        signals.request_started.disconnect(close_old_connections)
+        signals.request_finished.disconnect(close_old_connections)
+        try:
+            with transaction.atomic():
+                scenarios = self.scenarios()
+                results = {
+                    name: self.measure(*scenario)
+                    for name, scenario in scenarios.items()
+                }
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            signals.request_started.connect(close_old_connections)
+            signals.request_finished.connect(close_old_connections)
+        self.report(results)
+        report = {'meta': self.meta(), 'results': results}
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    def scenarios(self):
+        """Сценарии на самых «тяжёлых» объектах базы.
+
+        Каждый маршрут из `posts/urls.py` должен войти хотя бы в один
+        сценарий, иначе замер прерывается.
+        """
+        post = (
+            Post.objects.annotate(total=Count('comments'))
+            .order_by('-total').first()
+        )
+        if post is None:
+            raise CommandError(
+                'В базе нет постов, сначала выполните manage.py seed.'
+            )
+        author = User.objects.annotate(
+            total=Count('author_posts')
+        ).order_by('-total').first()
+        reader = User.objects.annotate(
+            total=Count('follower')
+        ).order_by('-total').first()
+        group = Group.objects.annotate(
+            total=Count('posts')
+        ).order_by('-total').first()
+        target = Follow.objects.exclude(user=reader).exclude(
+            author=reader
+        ).values_list('author__username', flat=True).first()
+        owned = author.author_posts.first()
+        guest, author_session, reader_session = (
+            self.session(None), self.session(author), self.session(reader)
+        )
+        scenarios = {
+            'index': ('GET', reverse('posts:index'), guest),
+            'index page 100': (
+                'GET', reverse('posts:index') + '?page=100', guest
+            ),
+            'search': (
+                'GET',
+                reverse('posts:search') + '?' + urlencode(
+                    {'q': post.text.split()[0]}
+                ),
+                guest,
+            ),
+            'group_list': (
+                'GET',
+                reverse('posts:group_list', kwargs={'slug': group.slug}),
+                guest,
+            ),
+            'profile': (
+                'GET',
+                reverse('posts:profile', kwargs={'username': author}),
+                reader_session,
+            ),
+            'post_detail': (
+                'GET',
+                reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+                guest,
+            ),
+            'follow_index': (
+                'GET', reverse('posts:follow_index'), reader_session
+            ),
+            'post_create GET': (
+                'GET', reverse('posts:post_create'), author_session
+            ),
+            'post_edit GET': (
+                'GET',
+                reverse('posts:post_edit', kwargs={'post_id': owned.pk}),
+                author_session,
+            ),
+            'post_create POST': (
+                'POST', reverse('posts:post_create'), author_session,
+                {'text': 'Пост из замера', 'group': group.pk},
+            ),
+            'post_edit POST': (
+                'POST',
+                reverse('posts:post_edit', kwargs={'post_id': owned.pk}),
+                author_session,
+                {'text': owned.text, 'group': owned.group_id or ''},
+            ),
+            'add_comment': (
+                'POST',
+                reverse('posts:add_comment', kwargs={'post_id': post.pk}),
+                reader_session,
+                {'text': 'Комментарий из замера'},
+            ),
+        }
+        if target is not None:
+            scenarios.update({
+                'profile_follow': (
+                    'GET',
+                    reverse(
+                        'posts:profile_follow', kwargs={'username': target}
+                    ),
+                    reader_session,
+                ),
+                'profile_unfollow': (
+                    'GET',
+                    reverse(
+                        'posts:profile_unfollow', kwargs={'username': target}
+                    ),
+                    reader_session,
+                ),
+            })
+        covered = {
+            name.split()[0] for name in scenarios
+        }
+        missing = {
+            pattern.name for pattern in urls.urlpatterns
+        } - covered
+        if missing:
+            raise CommandError(
+                'Нет сценариев для маршрутов: ' + ', '.join(sorted(missing))
+            )
+        return scenarios
+
+    def session(self, user):
+        """Cookie и CSRF-токен для запросов от имени `user`."""
+        token = get_random_string(32)
+        cookies = {settings.CSRF_COOKIE_NAME: token}
+        if user is not None:
+            client = Client()
+            client.force_login(user)
+            name = settings.SESSION_COOKIE_NAME
+            cookies[name] = client.cookies[name].value
+        return {
+            'HTTP_COOKIE': '; '.join(
+                f'{name}={value}' for name, value in cookies.items()
+            ),
+            'HTTP_X_CSRFTOKEN': token,
+        }
+
+    def environ(self, method, url, session, data=None):
+        path, _, query = url.partition('?')
+        body = urlencode(data or {}).encode()
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'HTTP_HOST': settings.ALLOWED_HOSTS[0],
+            'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+            'CONTENT_LENGTH': str(len(body)),
+            'REMOTE_ADDR': '127.0.0.1',
+            'wsgi.input': BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            **session,
+        }
+        setup_testing_defaults(environ)
+        return environ
+
+    def request(self, method, url, session, data=None):
+        statuses = []
+        response = self.application(
+            self.environ(method, url, session, data),
+            lambda status, headers, exc_info=None: statuses.append(status),
+        )
+        try:
+            b''.join(response)
+        finally:
+            response.close()
+        return int(statuses[0].split()[0])
+
+    def measure(self, method, url, session, data=None):
+        options = self.options
+        for _ in range(options['warmup']):
+            self.request(method, url, session, data)
+        timings = []
+        queries = []
+        statuses = set()
+        for _ in range(options['requests']):
+            if options['cold']:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                statuses.add(self.request(method, url, session, data))
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+        if statuses - {200, 302}:
+            raise CommandError(f'{method} {url}: ответы {sorted(statuses)}')
+        return {
+            'method': method,
+            'url': url,
+            'status': sorted(statuses),
+            'p50': statistics.median(timings),
+            'p95': percentile(timings, 0.95),
+            'p99': percentile(timings, 0.99),
+            'rps': len(timings) / (sum(timings) / 1000),
+            'queries': max(queries),
+        }
+
+    def meta(self):
+        try:
+            revision = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                capture_output=True, text=True, cwd=settings.BASE_DIR,
+            ).stdout.strip()
+        except OSError:
+            revision = ''
+        return {
+            'date': timezone.now().isoformat(),
+            'revision': revision,
+            'requests': self.options['requests'],
+            'cold': self.options['cold'],
+            'posts': Post.objects.count(),
+            'users': User.objects.count(),
+        }
+
+    def report(self, results):
+        self.stdout.write(
+            f'{"сценарий":<20} {"p50":>8} {"p95":>8} {"p99":>8} '
+            f'{"rps":>8} {"SQL":>5}'
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<20} {result["p50"]:>8.2f} {result["p95"]:>8.2f} '
+                f'{result["p99"]:>8.2f} {result["rps"]:>8.0f} '
+                f'{result["queries"]:>5}'
+            )
+
+    def compare(self, path, results):
+        with open(path) as source:
+            previous = json.load(source)
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'\nСравнение с {path} ({previous["meta"].get("revision")})'
+        ))
+        threshold = self.options['threshold']
+        regressions = []
+        for name, result in results.items():
+            before = previous['results'].get(name)
+            if before is None:
+                continue
+            changes = []
+            for metric in COMPARED:
+                old, new = before[metric], result[metric]
+                delta = (new - old) / old * 100 if old else 0
+                changes.append(f'{metric} {old:.2f} -> {new:.2f} '
+                               f'({delta:+.0f}%)')
+                if delta > threshold:
+                    regressions.append(f'{name}: {metric} {delta:+.0f}%')
+            self.stdout.write(f'{name:<20} ' + ', '.join(changes))
+        if regressions:
+            raise CommandError('Регрессии: ' + '; '.join(regressions))
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
@@ -0,0 +1,172 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+
+from posts.constants import POSTS_PER_PAGE
+from posts.models import Comment, Group, Post
+from posts.utils import KeysetPaginator
+
+User = get_user_model()
+
+BENCH_AUTHORS = 1000
+BENCH_GROUPS = 50
+INDEXES = {
+    Post: [index.name for index in Post._meta.indexes],
+    Comment: [index.name for index in Comment._meta.indexes],
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает планы (EXPLAIN QUERY PLAN) и время запросов листингов '
+        'с составными индексами и без них. Индексы удаляются внутри '
+        'транзакции, которая в конце откатывается; недостающие до --posts '
+        'посты тоже создаются в ней.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts', type=int, default=1_000_000,
+            help='Сколько постов должно быть в базе на время замера.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Сколько раз выполнять каждый запрос.',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Замер поддерживается только для SQLite.')
+        self.repeat = options['repeat']
+        try:
+            with transaction.atomic():
+                self.fill(options['posts'])
+                shapes = self.shapes()
+                after = self.measure(shapes, 'after')
+                self.drop_indexes()
+                before = self.measure(shapes, 'before')
+                self.report(shapes, before, after)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def fill(self, total):
+        missing = total - Post.objects.count()
+        if missing <= 0:
+            return
+        self.stdout.write(f'Создаём {missing} постов для замера...')
+        User.objects.bulk_create(
+            User(username=f'bench-author-{number}')
+            for number in range(BENCH_AUTHORS)
+        )
+        Group.objects.bulk_create(
+            Group(slug=f'bench-group-{number}', title='Bench')
+            for number in range(BENCH_GROUPS)
+        )
+        authors = list(User.objects.filter(username__startswith='bench-'))
+        groups = list(Group.objects.filter(slug__startswith='bench-'))
+        batch = 10_000
+        for start in range(0, missing, batch):
+            Post.objects.bulk_create(
+                Post(
+                    text=f'Пост для замера {number}',
+                    author=authors[number % len(authors)],
+                    group=groups[number % len(groups)] if number % 3 else None,
+                )
+                for number in range(start, min(start + batch, missing))
+            )
+        post = Post.objects.filter(author=authors[0]).first()
+        Comment.objects.bulk_create(
+            Comment(text=f'Комментарий {number}', author=authors[0], post=post)
+            for number in range(1000)
+        )
+        cursor = connection.cursor()
+        cursor.execute('ANALYZE')
+
+    def shapes(self):
+        """Запросы в том виде, в каком их строят представления."""
+        group = self.busiest(Post.objects.exclude(group=None), 'group')
+        author = self.busiest(Post.objects, 'author')
+        post = self.busiest(Comment.objects, 'post')
+        listing = Post.objects.for_listing()
+        depth = POSTS_PER_PAGE * 1000
+        deep = listing.order_by('-pub_date', '-id').values_list(
+            'pub_date', 'id'
+        )[depth:depth + 1]
+        shapes = {
+            'index': listing,
+            'group_posts': listing.filter(group_id=group),
+            'profile': listing.filter(author_id=author),
+            'post_detail comments': Comment.objects.filter(
+                post_id=post
+            ).order_by('-created'),
+        }
+        if deep:
+            paginator = KeysetPaginator(listing, POSTS_PER_PAGE)
+            shapes['index keyset page 1000'] = listing.filter(
+                paginator.seek(deep[0])
+            ).order_by(*paginator.ordering)
+        return {
+            name: queryset[:POSTS_PER_PAGE].query.sql_with_params()
+            for name, queryset in shapes.items()
+        }
+
+    def busiest(self, queryset, field):
+        row = (
+            queryset.order_by().values_list(field)
+            .annotate(total=Count('pk')).order_by('-total').first()
+        )
+        return row[0] if row else None
+
+    def measure(self, shapes, phase):
+        results = {}
+        cursor = connection.cursor()
+        for name, (sql, params) in shapes.items():
+            # Комментарий не даёт sqlite3 взять план из кеша выражений,
+            # подготовленного до удаления индексов.
+            sql = f'{sql} /* {phase} */'
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = [row[-1] for row in cursor.fetchall()]
+            timings = []
+            for _ in range(self.repeat):
+                started = time.perf_counter()
+                cursor.execute(sql, params)
+                cursor.fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = plan, statistics.median(timings)
+        return results
+
+    def drop_indexes(self):
+        cursor = connection.cursor()
+        for names in INDEXES.values():
+            for name in names:
+                cursor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+    def report(self, shapes, before, after):
+        self.stdout.write(
+            f'Постов: {Post.objects.count()}, '
+            f'комментариев: {Comment.objects.count()}'
+        )
+        for name in shapes:
+            plan_before, time_before = before[name]
+            plan_after, time_after = after[name]
+            speedup = time_before / time_after if time_after else 0
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{name}'))
+            self.stdout.write('  без индексов:')
+            for line in plan_before:
+                self.stdout.write(f'    {line}')
+            self.stdout.write('  с индексами:')
+            for line in plan_after:
+                self.stdout.write(f'    {line}')
+            self.stdout.write(
+                f'  медиана: {time_before:.2f} мс -> {time_after:.2f} мс '
+                f'(x{speedup:.1f})'
+            )
@@ -0,0 +1,72 @@
+from django.contrib.auth import get_user_model
+from django.core import signals
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import CommandError
+from django.db import close_old_connections, transaction
+from django.db.models import Count
+from django.test import override_settings
+from django.urls import reverse
+
+from .bench_http import Command as HttpCommand, Rollback
+
+User = get_user_model()
+
+ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached': 'django.contrib.sessions.backends.cached_db',
+    'core': 'core.sessions',
+}
+VIEWS = ('index', 'follow_index')
+
+
+class Command(HttpCommand):
+    help = (
+        'Сравнивает движки сессий на index и follow_index от имени '
+        'читателя с наибольшим числом подписок: p50/p95/p99, запросов в '
+        'секунду и число SQL-запросов. Запросы идут через WSGI-приложение, '
+        'собранное заново для каждого движка.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Сколько запросов выполнять в каждом сценарии.',
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=10,
+            help='Сколько запросов сделать до замера.',
+        )
+        parser.add_argument(
+            '--engines', nargs='+', choices=ENGINES, default=list(ENGINES),
+        )
+
+    def handle(self, *args, **options):
+        self.options = {**options, 'cold': False}
+        reader = User.objects.annotate(
+            total=Count('follower')
+        ).order_by('-total').first()
+        if reader is None:
+            raise CommandError(
+                'В базе нет пользователей, сначала выполните manage.py seed.'
+            )
+        signals.request_started.disconnect(close_old_connections)
+        signals.request_finished.disconnect(close_old_connections)
+        results = {}
+        try:
+            with transaction.atomic():
+                for name in options['engines']:
+                    with override_settings(SESSION_ENGINE=ENGINES[name]):
+                        # SessionMiddleware выбирает движок при создании.
+                        self.application = WSGIHandler()
+                        session = self.session(reader)
+                        for view in VIEWS:
+                            results[f'{view} {name}'] = self.measure(
+                                'GET', reverse(f'posts:{view}'), session
+                            )
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            signals.request_started.connect(close_old_connections)
+            signals.request_finished.connect(close_old_connections)
+        self.report(results)
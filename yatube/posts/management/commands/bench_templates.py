@@ -0,0 +1,122 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.template.loader import render_to_string
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+
+from posts.models import Group, Post
+
+from .bench_http import percentile
+
+User = get_user_model()
+
+TEMPLATE = 'posts/index.html'
+# Отдельный кеш: фрагменты несохранённых постов не должны попасть в общий.
+BENCH_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bench-templates',
+        'OPTIONS': {'MAX_ENTRIES': 100_000},
+    },
+}
+
+
+def loaders(cached):
+    engine = dict(settings.TEMPLATES[0])
+    options = dict(engine['OPTIONS'])
+    options['loaders'] = (
+        [('django.template.loaders.cached.Loader', settings.TEMPLATE_LOADERS)]
+        if cached else settings.TEMPLATE_LOADERS
+    )
+    engine['OPTIONS'] = options
+    return [engine]
+
+
+def make_posts(count):
+    """Посты в памяти, как их отдаёт for_listing(); база не нужна."""
+    groups = [
+        Group(pk=pk, title=f'Группа {pk}', slug=f'group-{pk}')
+        for pk in range(1, 11)
+    ]
+    authors = [
+        User(pk=pk, username=f'author{pk}', first_name='Имя',
+             last_name=f'Фамилия {pk}')
+        for pk in range(1, 51)
+    ]
+    now = timezone.now()
+    return [
+        Post(
+            pk=pk,
+            text=f'Текст поста номер {pk}. ' * 5,
+            pub_date=now,
+            author=authors[pk % len(authors)],
+            group=groups[pk % len(groups)] if pk % 3 else None,
+            comment_count=pk % 7,
+        )
+        for pk in range(1, count + 1)
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет рендеринг posts/index.html со страницей из 10, 100 и '
+        '1000 постов: с загрузчиками шаблонов как при DEBUG и с '
+        'кеширующим загрузчиком, с холодным и тёплым кешем карточек.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[10, 100, 1000],
+            help='Сколько постов на странице.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Сколько раз рендерить каждый вариант.',
+        )
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        self.stdout.write(
+            f'{"постов":>7} {"загрузчик":<10} {"карточки":<9} '
+            f'{"медиана, мс":>12} {"p95, мс":>9}'
+        )
+        for size in options['sizes']:
+            page = Paginator(make_posts(size), size).page(1)
+            context = {'title': 'Замер', 'page_obj': page}
+            for cached in (False, True):
+                with override_settings(
+                    TEMPLATES=loaders(cached), CACHES=BENCH_CACHES
+                ):
+                    for warm in (False, True):
+                        timings = self.measure(
+                            request, context, warm, options['repeat']
+                        )
+                        self.stdout.write(
+                            f'{size:>7} '
+                            f'{"cached" if cached else "debug":<10} '
+                            f'{"тёплые" if warm else "холодные":<9} '
+                            f'{statistics.median(timings):>12.2f} '
+                            f'{self.p95(timings):>9.2f}'
+                        )
+
+    def measure(self, request, context, warm, repeat):
+        render_to_string(TEMPLATE, context, request)
+        timings = []
+        for _ in range(repeat):
+            if not warm:
+                cache.clear()
+            started = time.perf_counter()
+            render_to_string(TEMPLATE, context, request)
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+    def p95(self, timings):
+        return percentile(timings, 0.95)
@@ -0,0 +1,39 @@
+import gzip
+
+from django.core.management.base import BaseCommand
+
+from posts import dataset
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает пользователей, группы, посты, комментарии и подписки в '
+        'сжатый NDJSON. В отличие от dumpdata, таблицы читаются порциями '
+        'и сразу пишутся в файл, не загружаясь в память целиком.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='yatube.ndjson.gz',
+            help='Файл выгрузки.',
+        )
+        parser.add_argument(
+            '--chunk', type=int, default=dataset.CHUNK,
+            help='Сколько строк читать одним запросом.',
+        )
+
+    def handle(self, *args, **options):
+        with gzip.open(options['path'], 'wt', encoding='utf-8') as output:
+            counts = dataset.dump(output, options['chunk'])
+        for name, count in counts.items():
+            self.stdout.write(f'{name}: {count}')
+        missing = dataset.missing_media(dataset.images(options['chunk']))
+        if missing:
+            self.stderr.write(
+                f'Нет файлов картинок ({len(missing)}), например: '
+                + ', '.join(missing[:5])
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгружено в {options["path"]}. Картинки постов перенесите '
+            f'вместе с каталогом медиафайлов.'
+        ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Строит недостающие миниатюры картинок всех постов, например после '
+        'изменения THUMBNAIL_SIZES или очистки хранилища миниатюр.'
+    )
+
+    def handle(self, *args, **options):
+        images = Post.objects.exclude(image='').values_list('pk', 'image')
+        built = 0
+        for post_id, name in images.iterator():
+            built += len(thumbnails.generate(post_id, name))
+        self.stdout.write(self.style.SUCCESS(f'Построено миниатюр: {built}'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает денормализованные счётчики постов и комментариев. '
+        'Предназначена для периодического запуска (например, из cron).'
+    )
+
+    def handle(self, *args, **options):
+        fixed, created, removed = counters.reconcile()
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено: {fixed}, создано: {created}, удалено: {removed}'
+        ))
@@ -0,0 +1,239 @@
+import multiprocessing
+import os
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from posts import counters, search, seeding, timeline
+from posts.models import Comment, Follow, Group, Post
+from posts.utils import explicit_dates
+
+User = get_user_model()
+
+
+def last_pk(model):
+    return model.objects.aggregate(last=Max('pk'))['last'] or 0
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет базу повторяемым набором данных для замеров: '
+        'пользователи, группы, посты, подписки и комментарии с реалистичным '
+        'перекосом (степенной закон для подписчиков, несколько очень '
+        'популярных и плодовитых авторов). Строки генерируются пулом '
+        'процессов и пишутся пакетами через bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--groups', type=int, default=1_000)
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--follows', type=int, default=1_000_000)
+        parser.add_argument('--comments', type=int, default=2_000_000)
+        parser.add_argument(
+            '--heavy', type=int, default=5,
+            help='Сколько самых популярных авторов также пишут больше всех.',
+        )
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель закона Ципфа для авторов.',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней распределены даты постов и комментариев.',
+        )
+        parser.add_argument('--batch', type=int, default=5_000)
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Число процессов, генерирующих строки.',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Зерно генератора: одинаковое зерно даёт одинаковые данные.',
+        )
+        parser.add_argument(
+            '--prefix', default='seed',
+            help='Префикс имён создаваемых пользователей и групп.',
+        )
+        parser.add_argument(
+            '--password', default='yatube',
+            help='Пароль всех создаваемых пользователей.',
+        )
+        parser.add_argument(
+            '--skip-timelines', action='store_true',
+            help='Не раскладывать посты по лентам подписчиков.',
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(
+                f'Пользователи с префиксом «{prefix}» уже есть, '
+                f'укажите другой --prefix.'
+            )
+        self.base = {
+            'seed': options['seed'],
+            'prefix': prefix,
+            'now': timezone.now(),
+            'period': options['days'] * 24 * 60 * 60,
+        }
+        started = time.perf_counter()
+        users = self.seed_users()
+        groups = self.seed_groups()
+        # Популярность и плодовитость авторов почти не связаны, кроме
+        # нескольких самых популярных, которые и пишут больше всех.
+        rng = random.Random(options['seed'])
+        authors = users[:]
+        rng.shuffle(authors)
+        heavy = options['heavy']
+        rest = authors[heavy:]
+        rng.shuffle(rest)
+        posters = authors[:heavy] + rest
+        weights = seeding.zipf_cum_weights(len(users), options['skew'])
+        with explicit_dates(
+            Post._meta.get_field('pub_date'),
+            Comment._meta.get_field('created'),
+        ):
+            posts = self.seed_posts(posters, weights, groups)
+            follows_from = last_pk(Follow)
+            self.seed_follows(users, authors, weights)
+            self.seed_comments(users, posts)
+        self.stdout.write('Пересчёт счётчиков...')
+        counters.reconcile()
+        self.stdout.write('Построение поискового индекса...')
+        with transaction.atomic():
+            search.rebuild()
+        if not options['skip_timelines']:
+            self.seed_timelines(follows_from)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.perf_counter() - started:.0f} с'
+        ))
+
+    def run(self, label, generate, total, write, **context):
+        """Сгенерировать `total` строк в пуле и записать их пакетами."""
+        options = self.options
+        tasks = seeding.tasks(total, options['batch'])
+        context = {**self.base, **context}
+        started = time.perf_counter()
+        done = 0
+        workers = min(options['workers'], len(tasks))
+        if workers > 1:
+            pool = multiprocessing.Pool(
+                workers,
+                initializer=seeding.init,
+                initargs=(options['seed'], context),
+            )
+            batches = pool.imap(generate, tasks)
+        else:
+            pool = None
+            seeding.init(options['seed'], context)
+            batches = map(generate, tasks)
+        try:
+            for rows in batches:
+                with transaction.atomic():
+                    write(rows)
+                done += len(rows)
+                rate = done / (time.perf_counter() - started)
+                self.stdout.write(
+                    f'{label}: {done}/{total} ({rate:.0f} строк/с)'
+                )
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+    def seed_users(self):
+        start = last_pk(User)
+        password = make_password(self.options['password'])
+        self.run(
+            'Пользователи', seeding.users, self.options['users'],
+            lambda rows: User.objects.bulk_create(
+                User(
+                    username=username,
+                    first_name=first_name,
+                    last_name=last_name,
+                    password=password,
+                )
+                for username, first_name, last_name in rows
+            ),
+        )
+        return list(
+            User.objects.filter(pk__gt=start).order_by('pk')
+            .values_list('pk', flat=True)
+        )
+
+    def seed_groups(self):
+        start = last_pk(Group)
+        prefix = self.options['prefix']
+        Group.objects.bulk_create(
+            Group(
+                title=f'Группа {number}',
+                slug=f'{prefix}-group-{number}',
+                description=f'Группа для замеров номер {number}',
+            )
+            for number in range(self.options['groups'])
+        )
+        return list(
+            Group.objects.filter(pk__gt=start).order_by('pk')
+            .values_list('pk', flat=True)
+        )
+
+    def seed_posts(self, posters, weights, groups):
+        start = last_pk(Post)
+        self.run(
+            'Посты', seeding.posts, self.options['posts'],
+            lambda rows: Post.objects.bulk_create(
+                Post(text=text, author_id=author, group_id=group,
+                     pub_date=pub_date)
+                for text, author, group, pub_date in rows
+            ),
+            posters=posters,
+            poster_weights=weights,
+            groups=groups,
+        )
+        return list(
+            Post.objects.filter(pk__gt=start).order_by('-pub_date')
+            .values_list('pk', flat=True)
+        )
+
+    def seed_follows(self, users, authors, weights):
+        self.run(
+            'Подписки', seeding.follows, self.options['follows'],
+            lambda rows: Follow.objects.bulk_create(
+                (Follow(user_id=user, author_id=author)
+                 for user, author in rows),
+                ignore_conflicts=True,
+            ),
+            users=users,
+            authors=authors,
+            author_weights=weights,
+        )
+
+    def seed_comments(self, users, posts):
+        if not posts:
+            return
+        self.run(
+            'Комментарии', seeding.comments, self.options['comments'],
+            lambda rows: Comment.objects.bulk_create(
+                Comment(text=text, post_id=post, author_id=author,
+                        created=created)
+                for text, post, author, created in rows
+            ),
+            users=users,
+            posts=posts,
+        )
+
+    def seed_timelines(self, follows_from):
+        self.stdout.write(
+            f'Раскладка лент (авторов без раскладки: '
+            f'{len(timeline.heavy_authors())})...'
+        )
+        with transaction.atomic():
+            created = timeline.fill(follows_from)
+        self.stdout.write(f'Записей в лентах: {created}')
@@ -0,0 +1,123 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Значения posts.constants на момент миграции.
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_BACKFILL = 500
+
+
+def copy_follows(apps, schema_editor):
+    """Каждая связь старого M2M становится отдельной строкой Follow."""
+    LegacyFollow = apps.get_model('posts', 'LegacyFollow')
+    Follow = apps.get_model('posts', 'Follow')
+    edges = LegacyFollow.following.through.objects.filter(
+        legacyfollow__user__isnull=False,
+    ).values_list('legacyfollow__user_id', 'user_id')
+    Follow.objects.bulk_create(
+        (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in edges.iterator()
+            if user_id != author_id
+        ),
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+def fill_timelines(apps, schema_editor):
+    """Разложить посты по лентам скопированных подписок.
+
+    Лента подписок читается только из TimelineEntry, поэтому без этого
+    шага у существующих подписчиков она пустела бы. Повторяет
+    `posts.timeline.fill` на момент миграции.
+    """
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    heavy = list(
+        Follow.objects.values('author').annotate(total=models.Count('pk'))
+        .filter(total__gt=TIMELINE_FANOUT_LIMIT)
+        .values_list('author', flat=True)
+    )
+    quote = schema_editor.connection.ops.quote_name
+    sql = (
+        f'INSERT INTO {quote(TimelineEntry._meta.db_table)} '
+        f'(user_id, post_id, pub_date) '
+        f'SELECT f.user_id, p.id, p.pub_date '
+        f'FROM {quote(Follow._meta.db_table)} f '
+        f'JOIN ('
+        f' SELECT id, author_id, pub_date, ROW_NUMBER() OVER ('
+        f'  PARTITION BY author_id ORDER BY pub_date DESC'
+        f' ) AS position FROM {quote(Post._meta.db_table)}'
+        f') p ON p.author_id = f.author_id '
+        f'WHERE p.position <= %s'
+    )
+    params = [TIMELINE_BACKFILL]
+    if heavy:
+        sql += ' AND f.author_id NOT IN (%s)' % ', '.join(
+            '%s' for _ in heavy
+        )
+        params.extend(heavy)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def clear_timelines(apps, schema_editor):
+    apps.get_model('posts', 'TimelineEntry').objects.all().delete()
+
+
+def restore_follows(apps, schema_editor):
+    LegacyFollow = apps.get_model('posts', 'LegacyFollow')
+    Follow = apps.get_model('posts', 'Follow')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    LegacyFollow.objects.bulk_create(
+        LegacyFollow(user_id=user_id)
+        for user_id in User.objects.values_list('pk', flat=True)
+    )
+    legacy = dict(LegacyFollow.objects.values_list('user_id', 'pk'))
+    Through = LegacyFollow.following.through
+    Through.objects.bulk_create(
+        (
+            Through(legacyfollow_id=legacy[user_id], user_id=author_id)
+            for user_id, author_id in Follow.objects.values_list(
+                'user_id', 'author_id'
+            ).iterator()
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0026_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.RenameModel('Follow', 'LegacyFollow'),
+        migrations.CreateModel(
+            name='Follow',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='following', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='follower', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Подписка',
+                'verbose_name_plural': 'Подписки',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.CheckConstraint(check=models.Q(_negated=True, user=models.F('author')), name='prevent_self_follow'),
+        ),
+        migrations.RunPython(copy_follows, restore_follows),
+        migrations.RunPython(fill_timelines, clear_timelines),
+        migrations.DeleteModel('LegacyFollow'),
+    ]
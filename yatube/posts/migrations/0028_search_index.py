@@ -0,0 +1,200 @@
+"""Полнотекстовый индекс постов и комментариев.
+
+Миграция не импортирует код приложения: схема таблиц FTS5 и стеммер
+(копия `posts.stemmer` на момент миграции) записаны здесь, чтобы
+дальнейшие изменения `posts.search` не меняли её результат.
+"""
+import re
+from functools import lru_cache
+from itertools import islice
+
+from django.db import migrations
+
+POSTS_TABLE = 'posts_postsearch'
+COMMENTS_TABLE = 'posts_commentsearch'
+TOKENIZER = "tokenize = 'unicode61 remove_diacritics 2'"
+SCHEMA = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {POSTS_TABLE} '
+    f'USING fts5(body, {TOKENIZER})',
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {COMMENTS_TABLE} '
+    f'USING fts5(body, post_id UNINDEXED, {TOKENIZER})',
+)
+BATCH_SIZE = 1000
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = (
+    (),
+    (
+        'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+        'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+        'ая', 'яя', 'ою', 'ею',
+    ),
+)
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = ((), ('ся', 'сь'))
+VERB = (
+    (
+        'ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но',
+        'ет', 'ют', 'ны', 'ть', 'ешь', 'нно',
+    ),
+    (
+        'ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей',
+        'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует',
+        'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю',
+    ),
+)
+NOUN = (
+    (),
+    (
+        'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+        'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам',
+        'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+        'ья', 'я',
+    ),
+)
+DERIVATIONAL = ((), ('ост', 'ость'))
+SUPERLATIVE = ((), ('ейш', 'ейше'))
+
+WORD = re.compile(r'\w+')
+
+
+def _regions(word):
+    """Начала областей RV и R2."""
+    rv = r1 = r2 = len(word)
+    for position, letter in enumerate(word):
+        if letter in VOWELS:
+            rv = position + 1
+            break
+    for position in range(1, len(word)):
+        if word[position] not in VOWELS and word[position - 1] in VOWELS:
+            r1 = position + 1
+            break
+    for position in range(r1 + 1, len(word)):
+        if word[position] not in VOWELS and word[position - 1] in VOWELS:
+            r2 = position + 1
+            break
+    return rv, r2
+
+
+def _strip(word, start, groups):
+    """Отрезать самое длинное окончание из `groups`, лежащее после `start`.
+
+    Окончания первой группы должны идти после «а» или «я». Как и в
+    Snowball, если самое длинное совпадение не подходит по этому
+    условию, более короткие не проверяются.
+    """
+    best = None
+    for group, endings in enumerate(groups):
+        for ending in endings:
+            if (
+                word.endswith(ending)
+                and len(word) - len(ending) >= start
+                and (best is None or len(ending) > len(best[1]))
+            ):
+                best = group, ending
+    if best is None:
+        return None
+    group, ending = best
+    stem = word[:-len(ending)]
+    if group == 0 and not (len(stem) > start and stem[-1] in 'ая'):
+        return None
+    return stem
+
+
+@lru_cache(maxsize=100_000)
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    if not any('а' <= letter <= 'я' for letter in word):
+        return word
+    rv, r2 = _regions(word)
+    result = _strip(word, rv, PERFECTIVE_GERUND)
+    if result is None:
+        word = _strip(word, rv, REFLEXIVE) or word
+        adjective = _strip(word, rv, ADJECTIVE)
+        if adjective is not None:
+            result = _strip(adjective, rv, PARTICIPLE) or adjective
+        else:
+            result = _strip(word, rv, VERB) or _strip(word, rv, NOUN)
+    word = result if result is not None else word
+    if word.endswith('и') and len(word) - 1 >= rv:
+        word = word[:-1]
+    word = _strip(word, r2, DERIVATIONAL) or word
+    if word.endswith('нн') and len(word) - 2 >= rv:
+        return word[:-1]
+    superlative = _strip(word, rv, SUPERLATIVE)
+    if superlative is not None:
+        word = superlative
+        if word.endswith('нн') and len(word) - 2 >= rv:
+            word = word[:-1]
+        return word
+    if word.endswith('ь') and len(word) - 1 >= rv:
+        word = word[:-1]
+    return word
+
+
+def normalize(text):
+    return ' '.join(stem(word) for word in WORD.findall(text))
+
+
+def _insert(cursor, sql, rows):
+    while True:
+        batch = list(islice(rows, BATCH_SIZE))
+        if not batch:
+            return
+        cursor.executemany(sql, batch)
+
+
+def create_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    with connection.cursor() as cursor:
+        for statement in SCHEMA:
+            cursor.execute(statement)
+        _insert(
+            cursor,
+            f'INSERT INTO {POSTS_TABLE} (rowid, body) VALUES (%s, %s)',
+            (
+                (pk, normalize(text)) for pk, text in
+                Post.objects.values_list('pk', 'text').iterator()
+            ),
+        )
+        _insert(
+            cursor,
+            f'INSERT INTO {COMMENTS_TABLE} (rowid, body, post_id) '
+            f'VALUES (%s, %s, %s)',
+            (
+                (pk, normalize(text), post) for pk, text, post in
+                Comment.objects.values_list(
+                    'pk', 'text', 'post_id'
+                ).iterator()
+            ),
+        )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table in (POSTS_TABLE, COMMENTS_TABLE):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {table}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0027_follow_edges'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -1,8 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 from core.models import CreatedModel
-from django.db.models.signals import post_save
-from django.dispatch import receiver
+
+from . import links
 
 User = get_user_model()
 
@@ -15,6 +15,29 @@ class Group(models.Model):
     def __str__(self):
         return str(self.title)
 
+    def get_absolute_url(self):
+        return links.group_url(self.slug)
+
+
+class PostQuerySet(models.QuerySet):
+    LISTING_FIELDS = (
+        'text',
+        'pub_date',
+        'image',
+        'comment_count',
+        'author__username',
+        'author__first_name',
+        'author__last_name',
+        'group__title',
+        'group__slug',
+    )
+
+    def for_listing(self):
+        """Посты для листингов: автор и группа через JOIN, без лишних полей."""
+        return self.select_related('author', 'group').only(
+            'author', 'group', *self.LISTING_FIELDS
+        )
+
 
 class Post(models.Model):
     text = models.TextField(
@@ -48,15 +71,57 @@ class Post(models.Model):
         null=True,
         help_text='Загрузите картинку'
     )
+    # Поддерживается сигналами `Comment` (см. `posts.counters`).
+    comment_count = models.PositiveIntegerField(
+        'Комментариев',
+        default=0,
+        editable=False,
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='post_pub_date_id_idx',
+            ),
+            models.Index(
+                fields=('group', '-pub_date', '-id'),
+                name='post_group_pub_date_idx',
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_pub_date_idx',
+            ),
+        )
 
     def __str__(self):
         return str(self.text[:15])
 
+    def save(self, force_insert=False, force_update=False, using=None,
+             update_fields=None):
+        # comment_count меняется только через F() (см. posts.counters):
+        # обычное сохранение записало бы значение, устаревшее в памяти.
+        if (
+            update_fields is None and not force_insert
+            and not self._state.adding
+        ):
+            deferred = self.get_deferred_fields()
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name != 'comment_count'
+                and field.attname not in deferred
+            ]
+        super().save(force_insert, force_update, using, update_fields)
+
+    def get_absolute_url(self):
+        return links.post_url(self.pk)
+
 
 class Comment(CreatedModel):
     post = models.ForeignKey(
@@ -78,30 +143,101 @@ class Comment(CreatedModel):
     )
 
     class Meta:
+        ordering = ('-created', '-id')
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = (
+            models.Index(
+                fields=('post', '-created', '-id'),
+                name='comment_post_created_idx',
+            ),
+        )
 
     def __str__(self) -> str:
         return str(self.text)
 
 
 class Follow(models.Model):
-    user = models.OneToOneField(
+    """Подписка: ребро «подписчик → автор»."""
+    user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         related_name='follower',
-        null=True,
         verbose_name='Подписчик',
     )
-    following = models.ManyToManyField(
+    author = models.ForeignKey(
         User,
-        blank=True,
-        related_name='followers',
-        verbose_name='followers'
+        on_delete=models.CASCADE,
+        related_name='following',
+        verbose_name='Автор',
     )
 
+    class Meta:
+        verbose_name = 'Подписка'
+        verbose_name_plural = 'Подписки'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'),
+                name='unique_follow',
+            ),
+            models.CheckConstraint(
+                check=~models.Q(user=models.F('author')),
+                name='prevent_self_follow',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user_id} -> {self.author_id}'
+
 
-@receiver(post_save, sender=User)
-def create_profile(sender, instance, created, **kwargs):
-    if created:
-        Follow(user=instance).save()
+class TimelineEntry(models.Model):
+    """Запись ленты подписок: пост автора, на которого подписан user."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'post'),
+                name='unique_timeline_entry',
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date', '-id'),
+                name='timeline_user_pub_date_idx',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user_id}: {self.post_id}'
+
+
+class Counter(models.Model):
+    """Денормализованный счётчик, обновляемый сигналами."""
+    name = models.CharField(
+        'Имя счётчика',
+        max_length=100,
+        primary_key=True,
+    )
+    value = models.IntegerField('Значение', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчик'
+        verbose_name_plural = 'Счётчики'
+
+    def __str__(self):
+        return f'{self.name}={self.value}'
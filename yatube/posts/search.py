@@ -0,0 +1,189 @@
+"""Полнотекстовый поиск по постам и комментариям.
+
+Тексты хранятся в виртуальных таблицах SQLite FTS5 уже в виде основ
+слов (`posts.stemmer`), так что поиск учитывает русскую морфологию.
+Таблицы обновляются сигналами при сохранении и удалении `Post` и
+`Comment`, а целиком перестраиваются командой
+`manage.py rebuild_search_index`. Результаты ранжируются по BM25; пост
+находится и по тексту своих комментариев, но ниже.
+
+На других СУБД FTS5 нет, и поиск сводится к `icontains` по тексту поста.
+"""
+from collections.abc import Sequence
+from itertools import islice
+
+from django.db import connection
+
+from .constants import SEARCH_COMMENT_WEIGHT, SEARCH_LIMIT
+from .models import Comment, Post
+from .stemmer import stems
+
+POSTS_TABLE = 'posts_postsearch'
+COMMENTS_TABLE = 'posts_commentsearch'
+TOKENIZER = "tokenize = 'unicode61 remove_diacritics 2'"
+SCHEMA = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {POSTS_TABLE} '
+    f'USING fts5(body, {TOKENIZER})',
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {COMMENTS_TABLE} '
+    f'USING fts5(body, post_id UNINDEXED, {TOKENIZER})',
+)
+BATCH_SIZE = 1000
+
+
+def available(using=connection):
+    return using.vendor == 'sqlite'
+
+
+def normalize(text):
+    return ' '.join(stems(text))
+
+
+def match_query(query):
+    """Запрос FTS5: все слова запроса как префиксы основ."""
+    return ' '.join(f'"{word}"*' for word in stems(query))
+
+
+def index_post(post):
+    if available():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT OR REPLACE INTO {POSTS_TABLE} (rowid, body) '
+                f'VALUES (%s, %s)',
+                [post.pk, normalize(post.text)],
+            )
+
+
+def forget_post(post_id):
+    if available():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {POSTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+
+
+def index_comment(comment):
+    if available():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT OR REPLACE INTO {COMMENTS_TABLE} '
+                f'(rowid, body, post_id) VALUES (%s, %s, %s)',
+                [comment.pk, normalize(comment.text), comment.post_id],
+            )
+
+
+def forget_comment(comment_id):
+    if available():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {COMMENTS_TABLE} WHERE rowid = %s',
+                [comment_id],
+            )
+
+
+def _insert(cursor, sql, rows):
+    total = 0
+    while True:
+        batch = list(islice(rows, BATCH_SIZE))
+        if not batch:
+            return total
+        cursor.executemany(sql, batch)
+        total += len(batch)
+
+
+def fill(cursor, posts, comments):
+    """Перестроить таблицы по парам (id, текст) и (id, текст, id поста)."""
+    for statement in SCHEMA:
+        cursor.execute(statement)
+    cursor.execute(f'DELETE FROM {POSTS_TABLE}')
+    cursor.execute(f'DELETE FROM {COMMENTS_TABLE}')
+    return _insert(
+        cursor,
+        f'INSERT INTO {POSTS_TABLE} (rowid, body) VALUES (%s, %s)',
+        ((pk, normalize(text)) for pk, text in posts),
+    ) + _insert(
+        cursor,
+        f'INSERT INTO {COMMENTS_TABLE} (rowid, body, post_id) '
+        f'VALUES (%s, %s, %s)',
+        ((pk, normalize(text), post) for pk, text, post in comments),
+    )
+
+
+def rebuild():
+    """Перестроить индекс по всем постам и комментариям."""
+    if not available():
+        return 0
+    with connection.cursor() as cursor:
+        return fill(
+            cursor,
+            Post.objects.values_list('pk', 'text').iterator(),
+            Comment.objects.values_list('pk', 'text', 'post_id').iterator(),
+        )
+
+
+def search_ids(query, limit=SEARCH_LIMIT):
+    """id постов, подходящих под запрос, от самых релевантных."""
+    match = match_query(query)
+    if not match:
+        return []
+    if not available():
+        return list(
+            Post.objects.filter(text__icontains=query.strip())
+            .values_list('pk', flat=True)[:limit]
+        )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT post_id FROM ('
+            f' SELECT rowid AS post_id, bm25({POSTS_TABLE}) AS rank'
+            f' FROM {POSTS_TABLE} WHERE {POSTS_TABLE} MATCH %s'
+            f' UNION ALL'
+            f' SELECT post_id, bm25({COMMENTS_TABLE}) * %s'
+            f' FROM {COMMENTS_TABLE} WHERE {COMMENTS_TABLE} MATCH %s'
+            f') GROUP BY post_id ORDER BY MIN(rank) LIMIT %s',
+            [match, SEARCH_COMMENT_WEIGHT, match, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def filter_posts(queryset, query):
+    """Все посты `queryset`, подходящие под запрос, без SEARCH_LIMIT.
+
+    Подзапрос к индексу выполняет сама база, поэтому порядок и
+    постраничный вывод остаются за `queryset` (например, в админке).
+    """
+    match = match_query(query)
+    if not match:
+        return queryset.none()
+    if not available():
+        return queryset.filter(text__icontains=query.strip())
+    return queryset.extra(
+        where=[
+            f'{queryset.model._meta.db_table}.id IN ('
+            f'SELECT rowid FROM {POSTS_TABLE} WHERE {POSTS_TABLE} MATCH %s'
+            f' UNION SELECT post_id FROM {COMMENTS_TABLE}'
+            f' WHERE {COMMENTS_TABLE} MATCH %s)'
+        ],
+        params=[match, match],
+    )
+
+
+class Results(Sequence):
+    """Найденные посты для пагинатора: загружается только срез страницы."""
+
+    def __init__(self, ids, queryset=None):
+        self.ids = ids
+        self.queryset = Post.objects.for_listing() if queryset is None \
+            else queryset
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        ids = self.ids[index]
+        posts = self.queryset.in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+
+def search(query, limit=SEARCH_LIMIT):
+    return Results(search_ids(query, limit))
@@ -0,0 +1,113 @@
+"""Генераторы строк для `manage.py seed`.
+
+Модуль не импортирует Django: функции выполняются в процессах пула и
+возвращают кортежи значений, а в базу их пишет родительский процесс.
+Каждый пакет строк получает собственный генератор случайных чисел,
+зависящий только от общего зерна и номера пакета, поэтому набор данных
+повторяется независимо от числа процессов.
+"""
+import itertools
+import random
+from datetime import timedelta
+
+from faker import Faker
+
+_context = {}
+
+
+def zipf_cum_weights(count, skew):
+    """Накопленные веса рангов 1..count по закону Ципфа."""
+    return list(itertools.accumulate(
+        1 / rank ** skew for rank in range(1, count + 1)
+    ))
+
+
+def init(seed, context):
+    """Инициализатор процесса пула: общие для всех пакетов данные."""
+    _context.clear()
+    _context.update(context, seed=seed)
+
+
+def _random(kind, index):
+    rng = random.Random(f'{_context["seed"]}:{kind}:{index}')
+    fake = Faker('ru_RU')
+    fake.seed_instance(rng.getrandbits(32))
+    return rng, fake
+
+
+def _moment(rng):
+    now = _context['now']
+    return now - timedelta(seconds=rng.random() * _context['period'])
+
+
+def users(task):
+    index, start, count = task
+    rng, fake = _random('users', index)
+    prefix = _context['prefix']
+    return [
+        (f'{prefix}{number}', fake.first_name(), fake.last_name())
+        for number in range(start, start + count)
+    ]
+
+
+def posts(task):
+    """Авторы и группы выбираются с перекосом: мало кто пишет много."""
+    index, _, count = task
+    rng, fake = _random('posts', index)
+    authors = rng.choices(
+        _context['posters'], cum_weights=_context['poster_weights'], k=count
+    )
+    groups = _context['groups']
+    rows = []
+    for author in authors:
+        group = None
+        if groups and rng.random() < 0.6:
+            group = groups[min(int(rng.paretovariate(1.2)), len(groups)) - 1]
+        rows.append((
+            fake.text(max_nb_chars=rng.choice((80, 200, 500, 1000))),
+            author,
+            group,
+            _moment(rng),
+        ))
+    return rows
+
+
+def comments(task):
+    """Свежие посты комментируют чаще старых."""
+    index, _, count = task
+    rng, fake = _random('comments', index)
+    posts = _context['posts']
+    users = _context['users']
+    return [
+        (
+            fake.sentence(nb_words=rng.randint(3, 25)),
+            posts[int(len(posts) * rng.random() ** 3)],
+            rng.choice(users),
+            _moment(rng),
+        )
+        for _ in range(count)
+    ]
+
+
+def follows(task):
+    """Число подписчиков распределено по степенному закону."""
+    index, _, count = task
+    rng, _ = _random('follows', index)
+    authors = rng.choices(
+        _context['authors'], cum_weights=_context['author_weights'], k=count
+    )
+    users = _context['users']
+    edges = set()
+    for author in authors:
+        user = rng.choice(users)
+        if user != author:
+            edges.add((user, author))
+    return sorted(edges)
+
+
+def tasks(total, batch):
+    """Пакеты `(номер, начало, размер)` для `total` строк."""
+    return [
+        (index, start, min(batch, total - start))
+        for index, start in enumerate(range(0, total, batch))
+    ]
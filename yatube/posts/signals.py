@@ -0,0 +1,197 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import (
+    conditional, counters, fragments, search, tasks, timeline
+)
+from .models import Comment, Follow, Group, Post, User
+
+
+DEFERRED = object()
+
+
+def _relations(post):
+    # Берём значения из __dict__, чтобы не подгружать отложенные поля.
+    return (
+        post.__dict__.get('author_id', DEFERRED),
+        post.__dict__.get('group_id', DEFERRED),
+    )
+
+
+@receiver(post_init, sender=Post)
+def remember_post_relations(sender, instance, **kwargs):
+    instance._counted_relations = _relations(instance)
+
+
+def _touch_post(post, group_ids):
+    group_ids = {pk for pk in group_ids if pk not in (None, DEFERRED)}
+    slugs = Group.objects.filter(pk__in=group_ids).values_list(
+        'slug', flat=True
+    ) if group_ids else []
+    conditional.touch(
+        conditional.POSTS,
+        conditional.post_scope(post.pk),
+        conditional.author_scope(post.author.username),
+        *(conditional.group_scope(slug) for slug in slugs),
+    )
+
+
+# Объявлен раньше count_saved_post: тот обновляет _counted_relations.
+@receiver(post_save, sender=Post)
+def touch_saved_post(sender, instance, **kwargs):
+    _, group_id = _relations(instance)
+    _touch_post(instance, (instance._counted_relations[1], group_id))
+
+
+@receiver(post_delete, sender=Post)
+def touch_deleted_post(sender, instance, **kwargs):
+    _touch_post(instance, (instance.group_id,))
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, **kwargs):
+    before = instance._counted_relations
+    after = _relations(instance)
+    if created:
+        counters.change(counters.POSTS, 1)
+        before = (None, None)
+    keys = (counters.author_key, counters.group_key)
+    for key, old, new in zip(keys, before, after):
+        if old == new or DEFERRED in (old, new):
+            continue
+        if old is not None:
+            counters.change(key(old), -1)
+        if new is not None:
+            counters.change(key(new), 1)
+    instance._counted_relations = after
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.change(counters.POSTS, -1)
+    counters.change(counters.author_key(instance.author_id), -1)
+    if instance.group_id is not None:
+        counters.change(counters.group_key(instance.group_id), -1)
+
+
+@receiver(post_delete, sender=Group)
+def forget_group_counter(sender, instance, **kwargs):
+    counters.forget(counters.group_key(instance.pk))
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.change_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.change_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created:
+        tasks.fan_out.delay(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def schedule_thumbnails(sender, instance, **kwargs):
+    if instance.image:
+        post_id, name = instance.pk, instance.image.name
+        # Файл картинки должен быть сохранён вместе с постом.
+        transaction.on_commit(
+            lambda: tasks.generate_thumbnails.delay(post_id, name)
+        )
+
+
+@receiver(post_save, sender=Follow)
+def subscribe(sender, instance, created, **kwargs):
+    if created:
+        counters.change(counters.followers_key(instance.author_id), 1)
+        tasks.backfill.delay(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def unsubscribe(sender, instance, **kwargs):
+    counters.change(counters.followers_key(instance.author_id), -1)
+    timeline.trim(instance.user_id, instance.author_id)
+    if timeline.became_light(instance.author_id):
+        # Посты, опубликованные сверх лимита, в ленты не раскладывались.
+        tasks.refill.delay(instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_fragments(sender, instance, **kwargs):
+    fragments.bump('post', instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_commented_post_fragments(sender, instance, **kwargs):
+    # Карточка поста показывает число комментариев.
+    fragments.bump('post', instance.post_id)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_fragments(sender, instance, **kwargs):
+    fragments.bump('group', instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_fragments(sender, instance, **kwargs):
+    fragments.bump('user', instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def touch_comment(sender, instance, **kwargs):
+    # Число комментариев видно и в карточке поста на листингах.
+    conditional.touch_post(instance.post_id)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def touch_group(sender, instance, **kwargs):
+    conditional.touch(
+        conditional.GROUPS, conditional.group_scope(instance.slug)
+    )
+
+
+@receiver(post_save, sender=User)
+def touch_user(sender, instance, created, update_fields=None, **kwargs):
+    # Вход пользователя сохраняет только last_login, новый ещё нигде не виден.
+    if created or update_fields == frozenset({'last_login'}):
+        return
+    conditional.touch(conditional.USERS)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def touch_follow(sender, instance, **kwargs):
+    conditional.touch(conditional.follows_scope(instance.user_id))
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def forget_post(sender, instance, **kwargs):
+    search.forget_post(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, **kwargs):
+    search.index_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def forget_comment(sender, instance, **kwargs):
+    search.forget_comment(instance.pk)
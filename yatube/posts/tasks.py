@@ -0,0 +1,36 @@
+"""Фоновые задачи постов: тяжёлые последствия сохранения моделей.
+
+Ставятся сигналами (`posts.signals`), выполняются воркерами очереди
+`core.tasks`. К моменту выполнения объект мог измениться или исчезнуть,
+поэтому задачи получают id и перечитывают состояние из базы.
+"""
+from core.tasks import task
+
+from . import thumbnails, timeline
+from .models import Follow, Post
+
+
+@task()
+def fan_out(post_id):
+    post = Post.objects.filter(pk=post_id).only(
+        'author_id', 'pub_date'
+    ).first()
+    if post is not None:
+        timeline.push(post)
+
+
+@task()
+def backfill(user_id, author_id):
+    # Читатель мог успеть отписаться, пока задача ждала в очереди.
+    if Follow.objects.filter(user_id=user_id, author_id=author_id).exists():
+        timeline.backfill(user_id, author_id)
+
+
+@task()
+def refill(author_id):
+    timeline.refill(author_id)
+
+
+@task()
+def generate_thumbnails(post_id, name):
+    thumbnails.generate(post_id, name)
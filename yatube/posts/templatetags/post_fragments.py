@@ -0,0 +1,10 @@
+from django import template
+
+from posts import fragments
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts, variant):
+    return fragments.render_posts(posts, variant)
@@ -0,0 +1,15 @@
+from django import template
+
+from posts import links
+
+register = template.Library()
+
+
+@register.filter
+def profile_url(user):
+    return links.profile_url(getattr(user, 'username', user))
+
+
+@register.filter
+def group_url(group):
+    return links.group_url(getattr(group, 'slug', group))
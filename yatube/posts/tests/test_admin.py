@@ -0,0 +1,92 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..admin import PostAdmin
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class PostAdminTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@yatube.ru', password='pass'
+        )
+        cls.groups = [
+            Group.objects.create(title=f'Группа {number}', slug=f'g{number}')
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:posts_post_changelist')
+
+    def tearDown(self):
+        cache.clear()
+
+    def create_posts(self, count):
+        start = Post.objects.count()
+        for number in range(start, start + count):
+            Post.objects.create(
+                text=f'Пост {number}',
+                author=User.objects.create_user(username=f'author{number}'),
+                group=self.groups[number % len(self.groups)],
+            )
+
+    def queries(self, **params):
+        self.client.get(self.url, params)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in captured]
+
+    def test_changelist_queries_do_not_depend_on_rows(self):
+        """Авторы и группы присоединяются, виджет группы не делает запросов."""
+        self.create_posts(1)
+        single = len(self.queries())
+        self.create_posts(20)
+        self.assertEqual(len(self.queries()), single)
+
+    def test_changelist_does_not_count_whole_table(self):
+        """Число постов берётся из счётчика, фильтр считается с лимитом."""
+        self.create_posts(5)
+        for params in ({}, {'group__id__exact': self.groups[0].pk}):
+            with self.subTest(params=params):
+                counts = [
+                    sql for sql in self.queries(**params)
+                    if 'COUNT(' in sql and 'posts_post' in sql
+                ]
+                self.assertTrue(all('LIMIT' in sql for sql in counts))
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['cl'].result_count, 5)
+
+    def test_pages_past_count_limit(self):
+        """Страница за пределом подсчёта открывается по номеру."""
+        self.create_posts(7)
+        # В группе 0 три поста, считаются два; p — номер страницы с нуля.
+        params = {'group__id__exact': self.groups[0].pk, 'p': 2}
+        with mock.patch('posts.admin.ADMIN_COUNT_LIMIT', 2), \
+                mock.patch.object(PostAdmin, 'list_per_page', 1):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                [post.text for post in response.context['cl'].result_list],
+                ['Пост 0'],
+            )
+            response = self.client.get(self.url, {**params, 'p': 5})
+        self.assertEqual(response.status_code, 302)
+
+    def test_group_is_autocomplete(self):
+        self.create_posts(1)
+        response = self.client.get(self.url)
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertContains(response, 'Группа 0')
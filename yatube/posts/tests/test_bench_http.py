@@ -0,0 +1,70 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from .. import urls
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class BenchHttpTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create_user(username='Ivank')
+        reader = User.objects.create_user(username='reader')
+        other = User.objects.create_user(username='other')
+        group = Group.objects.create(title='Группа', slug='group')
+        post = Post.objects.create(text='Пост', author=author, group=group)
+        Comment.objects.create(text='Комментарий', author=reader, post=post)
+        Follow.objects.create(user=reader, author=author)
+        Follow.objects.create(user=other, author=author)
+
+    def test_bench_covers_routes_and_rolls_back(self):
+        """Замер проходит по всем маршрутам и не меняет данные."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        output = os.path.join(directory.name, 'bench.json')
+        call_command(
+            'bench_http', requests=2, warmup=0, output=output,
+            stdout=StringIO(),
+        )
+        with open(output) as source:
+            results = json.load(source)['results']
+        routes = {name.split()[0] for name in results}
+        self.assertEqual(
+            routes, {pattern.name for pattern in urls.urlpatterns}
+        )
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertEqual(Comment.objects.count(), 1)
+        for result in results.values():
+            result['p95'] = float('inf')
+        results['index']['queries'] -= 1
+        with open(output, 'w') as source:
+            json.dump({'meta': {}, 'results': results}, source)
+        with self.assertRaisesMessage(CommandError, 'index: queries'):
+            call_command(
+                'bench_http', requests=2, warmup=0, compare=output,
+                stdout=StringIO(),
+            )
+
+    def test_bench_sessions(self):
+        """Замер движков сессий выводит строку на представление и движок."""
+        output = StringIO()
+        call_command(
+            'bench_sessions', requests=2, warmup=0, stdout=output,
+        )
+        lines = output.getvalue().splitlines()
+        for name in ('index db', 'follow_index core'):
+            with self.subTest(name=name):
+                self.assertTrue(
+                    any(line.startswith(name + ' ') for line in lines)
+                )
+        self.assertEqual(Post.objects.count(), 1)
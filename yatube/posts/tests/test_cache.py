@@ -17,36 +17,57 @@ TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PostPagesTests(TransactionTestCase):
     @classmethod
-    def setUpClass(cls):
-        super().setUpClass()
-        cls.author = User.objects.create_user(username='Ivank')
-        cls.group = Group.objects.create(
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='Ivank')
+        self.group = Group.objects.create(
             title='Test group 01',
             slug='test-group-01',
         )
-        cls.post = Post.objects.create(
+        self.post = Post.objects.create(
             text='Тестовый пост для тестирования',
-            author=cls.author,
-            group=cls.group,
+            author=self.author,
+            group=self.group,
         )
-        cls.comment = Comment.objects.create(
+        self.comment = Comment.objects.create(
             text='Тестовый комент для тестирования',
-            author=cls.author,
-            post=cls.post,
+            author=self.author,
+            post=self.post,
         )
-
-    @classmethod
-    def tearDownClass(cls):
-        super().tearDownClass()
-        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
-
-    def setUp(self):
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.author)
 
+    def tearDown(self):
+        cache.clear()
+
     def test_index_page_cache(self):
+        """Карточки постов берутся из кеша фрагментов."""
         cache.clear()
-        self.guest_client.get(reverse('posts:index'))
-        with self.assertNumQueries(0):
-            self.guest_client.get(reverse('posts:index'))
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertTemplateUsed(response, 'posts/includes/post_card.html')
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertTemplateNotUsed(response, 'posts/includes/post_card.html')
+        self.assertContains(response, self.post.text)
+
+    def test_changes_invalidate_fragments(self):
+        """Изменения поста и автора сразу видны на всех листингах."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+        )
+        for url in urls:
+            self.guest_client.get(url)
+        self.post.text = 'Отредактированный пост'
+        self.post.save()
+        self.author.first_name = 'Иван'
+        self.author.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertContains(response, 'Отредактированный пост')
+                self.assertContains(response, 'Иван')
@@ -0,0 +1,121 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import routers
+
+from .. import counters
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Ivank')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.post = Post.objects.create(
+            text='Тестовый пост', author=self.author, group=self.group
+        )
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def revalidate(self, url):
+        etag = self.guest_client.get(url)['ETag']
+        return self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_pages_are_not_rendered(self):
+        """Неизменившаяся страница отдаётся как 304 без шаблонов."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.revalidate(url)
+                self.assertEqual(response.status_code, 304)
+                self.assertFalse(response.templates)
+                self.assertEqual(
+                    self.revalidate(url + '?page=2').status_code, 304
+                )
+
+    def test_changes_invalidate_validators(self):
+        """Правка поста и новый комментарий меняют валидаторы."""
+        etags = {url: self.guest_client.get(url)['ETag'] for url in self.urls}
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, 'Исправленный пост')
+        etags = {url: self.guest_client.get(url)['ETag'] for url in self.urls}
+        Comment.objects.create(
+            text='Комментарий', author=self.author, post=self.post
+        )
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_pages_differ_per_user(self):
+        """Валидатор зависит от пользователя."""
+        url = self.urls[0]
+        etag = self.guest_client.get(url)['ETag']
+        client = Client()
+        client.force_login(self.author)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(DATABASE_REPLICAS=['default'])
+class LaggingReplicaTest(TestCase):
+    """Реплика — та же база; отставание изображается правкой без сигналов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Ivank')
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.post = Post.objects.create(
+            text='Старый текст', author=self.author
+        )
+        counters.posts_count()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_stale_replica_reads_are_not_cached(self):
+        """Страница со старой реплики не кешируется и не даёт валидаторов."""
+        url = reverse('posts:index')
+        routers.mark_synced(time.time() - 60)
+        self.post.text = 'Новый текст'
+        self.post.save()
+        Post.objects.filter(pk=self.post.pk).update(text='Старый текст')
+        response = self.guest_client.get(url)
+        self.assertContains(response, 'Старый текст')
+        self.assertFalse(response.has_header('ETag'))
+        Post.objects.filter(pk=self.post.pk).update(text='Новый текст')
+        routers.mark_synced(time.time() + 1)
+        response = self.guest_client.get(url)
+        self.assertContains(response, 'Новый текст')
+        etag = response['ETag']
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
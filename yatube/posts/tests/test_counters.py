@@ -0,0 +1,112 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import counters
+from ..models import Comment, Counter, Group, Post
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Ivank')
+        cls.group = Group.objects.create(
+            title='Test group 01',
+            slug='test-group-01',
+        )
+        cls.other_group = Group.objects.create(
+            title='Test group 02',
+            slug='test-group-02',
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.post = Post.objects.create(
+            text='Тестовый пост',
+            author=self.author,
+            group=self.group,
+        )
+
+    def test_counters_follow_posts_and_comments(self):
+        """Счётчики меняются при создании, переносе и удалении записей."""
+        self.assertEqual(counters.posts_count(), 1)
+        self.assertEqual(counters.group_posts_count(self.group), 1)
+        self.post.group = self.other_group
+        self.post.save()
+        Comment.objects.create(
+            text='Комментарий', author=self.author, post=self.post
+        )
+        expected = {
+            'posts': (counters.posts_count(), 1),
+            'author': (counters.author_posts_count(self.author), 1),
+            'old group': (counters.group_posts_count(self.group), 0),
+            'new group': (counters.group_posts_count(self.other_group), 1),
+            'comments': (Post.objects.get(pk=self.post.pk).comment_count, 1),
+        }
+        for label, (value, count) in expected.items():
+            with self.subTest(counter=label):
+                self.assertEqual(value, count)
+        self.post.delete()
+        self.assertEqual(counters.author_posts_count(self.author), 0)
+        self.assertEqual(counters.group_posts_count(self.other_group), 0)
+
+    def test_saving_post_keeps_comment_count(self):
+        """Пост, загруженный до комментария, не затирает счётчик."""
+        stale = Post.objects.get(pk=self.post.pk)
+        Comment.objects.create(
+            text='Комментарий', author=self.author, post=self.post
+        )
+        stale.text = 'Исправленный пост'
+        stale.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text, 'Исправленный пост')
+        self.assertEqual(self.post.comment_count, 1)
+
+    def test_comment_count_does_not_go_negative(self):
+        """Удаление комментариев, созданных в обход сигналов, не падает."""
+        Comment.objects.bulk_create([
+            Comment(text='Без сигнала', author=self.author, post=self.post),
+        ])
+        Comment.objects.filter(post=self.post).delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+
+    def test_reconcile_command_fixes_drift(self):
+        """Команда reconcile_counters исправляет расхождения."""
+        counters.posts_count()
+        Counter.objects.filter(name=counters.POSTS).update(value=42)
+        Post.objects.bulk_create([
+            Post(text='Без сигнала', author=self.author),
+        ])
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(counters.posts_count(), 2)
+        self.assertEqual(counters.author_posts_count(self.author), 2)
+
+    def test_listings_do_not_count_posts(self):
+        """Листинги и профиль не выполняют COUNT по таблице постов."""
+        counters.posts_count()
+        counters.author_posts_count(self.author)
+        counters.group_posts_count(self.group)
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    self.guest_client.get(url)
+                self.assertFalse([
+                    query for query in queries.captured_queries
+                    if 'COUNT(' in query['sql']
+                    and 'posts_post' in query['sql']
+                ])
@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from .. import counters, dataset, search
+from ..models import Comment, Follow, Group, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class DatasetTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'yatube.ndjson.gz')
+        author, reader = (
+            User.objects.create_user(username='Ivank', first_name='Иван'),
+            User.objects.create_user(username='reader'),
+        )
+        group = Group.objects.create(title='Группа', slug='group')
+        for number in range(5):
+            post = Post.objects.create(
+                text=f'Пост номер {number}', author=author, group=group,
+                image='posts/missing.gif' if number == 0 else '',
+            )
+            Comment.objects.create(post=post, author=reader, text='Ответ')
+        Follow.objects.create(user=reader, author=author)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def snapshot(self):
+        return {
+            model: list(dataset.rows(model)) for model in dataset.MODELS
+        }
+
+    def test_round_trip(self):
+        """Выгрузка и загрузка восстанавливают данные без изменений."""
+        before = self.snapshot()
+        errors = StringIO()
+        call_command(
+            'export_yatube', self.path, chunk=2,
+            stdout=StringIO(), stderr=errors,
+        )
+        self.assertIn('posts/missing.gif', errors.getvalue())
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        call_command(
+            'import_yatube', self.path, batch=3,
+            stdout=StringIO(), stderr=StringIO(),
+        )
+        self.assertEqual(self.snapshot(), before)
+        self.assertEqual(counters.reconcile(), (0, 0, 0))
+        self.assertEqual(TimelineEntry.objects.count(), 5)
+        self.assertEqual(len(search.search_ids('пост')), 5)
+
+    def test_import_requires_empty_database(self):
+        call_command('export_yatube', self.path, stdout=StringIO(),
+                     stderr=StringIO())
+        with self.assertRaisesMessage(CommandError, 'пустую базу'):
+            call_command('import_yatube', self.path, stdout=StringIO())
@@ -0,0 +1,38 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+
+from ..follows import is_following
+from ..models import Follow
+
+User = get_user_model()
+
+
+class FollowTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(3)
+        ]
+        Follow.objects.create(user=cls.user, author=cls.authors[0])
+        Follow.objects.create(user=cls.user, author=cls.authors[2])
+
+    def test_is_following_checks_authors_in_one_query(self):
+        """is_following проверяет всех авторов одним запросом."""
+        with self.assertNumQueries(1):
+            followed = is_following(self.user, self.authors)
+        self.assertEqual(followed, {self.authors[0].pk, self.authors[2].pk})
+        with self.assertNumQueries(0):
+            followed = is_following(AnonymousUser(), self.authors)
+        self.assertEqual(followed, set())
+
+    def test_follow_is_unique_and_not_self(self):
+        """Подписка уникальна, на себя подписаться нельзя."""
+        for author in (self.authors[0], self.user):
+            with self.subTest(author=author):
+                with self.assertRaises(IntegrityError), transaction.atomic():
+                    Follow.objects.create(user=self.user, author=author)
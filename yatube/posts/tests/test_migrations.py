@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+User = get_user_model()
+
+
+class FollowEdgesMigrationTest(TransactionTestCase):
+    migrate_from = [('posts', '0026_listing_indexes')]
+    migrate_to = [('posts', '0027_follow_edges')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_followers_keep_their_feed(self):
+        """Подписки старого формата получают ленту при миграции."""
+        apps = self.migrate(self.migrate_from)
+        OldUser = apps.get_model('auth', 'User')
+        reader = OldUser.objects.create(username='reader')
+        author = OldUser.objects.create(username='author')
+        post = apps.get_model('posts', 'Post').objects.create(
+            text='Старый пост', author=author
+        )
+        follow = apps.get_model('posts', 'Follow').objects.create(
+            user=reader
+        )
+        follow.following.add(author)
+        apps = self.migrate(self.migrate_to)
+        entries = apps.get_model('posts', 'TimelineEntry').objects.values_list(
+            'user_id', 'post_id'
+        )
+        self.assertEqual(list(entries), [(reader.pk, post.pk)])
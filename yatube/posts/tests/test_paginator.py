@@ -0,0 +1,84 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..constants import POSTS_PER_PAGE
+from ..models import Post
+from ..utils import KeysetPaginator
+
+User = get_user_model()
+# base64 от JSON [0, 5, 5]: значения курсора — числа, а не строки.
+NOT_STRINGS = 'WzAsIDUsIDVd'
+
+
+class KeysetPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Ivank')
+        for number in range(23):
+            Post.objects.create(
+                text=f'Пост номер {number}',
+                author=cls.author,
+            )
+        cls.ordered_ids = list(
+            Post.objects.order_by('-pub_date', '-id')
+            .values_list('id', flat=True)
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.paginator = KeysetPaginator(Post.objects.all(), POSTS_PER_PAGE)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_walk_forward_and_back(self):
+        """Курсоры последовательно обходят все записи в обе стороны."""
+        pages = [self.paginator.get_page(None)]
+        while pages[-1].has_next():
+            pages.append(self.paginator.get_page(pages[-1].next_cursor))
+        seen = [post.id for page in pages for post in page]
+        self.assertEqual(seen, self.ordered_ids)
+        self.assertEqual([len(page) for page in pages], [10, 10, 3])
+        self.assertFalse(pages[0].has_previous())
+        previous = self.paginator.get_page(pages[-1].previous_cursor)
+        self.assertEqual(
+            [post.id for post in previous],
+            [post.id for post in pages[1]],
+        )
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Неверный курсор приводит к первой странице."""
+        for cursor in ('garbage', 'W10', 'WzEsICJ4IiwgIjEiXQ', NOT_STRINGS):
+            with self.subTest(cursor=cursor):
+                page = self.paginator.get_page(cursor)
+                self.assertEqual(page[0].id, self.ordered_ids[0])
+
+    def test_views_ignore_cursor_with_wrong_types(self):
+        """Курсор с числами вместо строк не роняет листинги."""
+        post = Post.objects.get(pk=self.ordered_ids[0])
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url, {'cursor': NOT_STRINGS})
+                self.assertEqual(response.status_code, 200)
+
+    def test_page_is_constant_size_query(self):
+        """Страница по курсору загружается одним запросом без COUNT."""
+        cursor = self.paginator.get_page(None).next_cursor
+        with self.assertNumQueries(1):
+            page = self.paginator.get_page(cursor)
+            len(page)
+
+    def test_view_uses_cursor_from_query_string(self):
+        """Параметр ?cursor= включает пагинацию по ключу в листингах."""
+        response = self.guest_client.get(reverse('posts:index') + '?cursor=')
+        page_obj = response.context['page_obj']
+        self.assertTrue(page_obj.is_keyset)
+        self.assertEqual(len(page_obj), POSTS_PER_PAGE)
+        self.assertContains(response, f'?cursor={page_obj.next_cursor}')
@@ -0,0 +1,218 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import timeline
+from ..constants import COMMENT_ORDERING, COMMENTS_PER_PAGE, POSTS_PER_PAGE
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ListingQueriesTest(TestCase):
+    """Число запросов листингов не зависит от числа постов на странице."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(
+            username='Ivank',
+            first_name='Иван',
+            last_name='Иванов',
+        )
+        cls.group = Group.objects.create(
+            title='Test group 01',
+            slug='test-group-01',
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.authorized_client.get(
+            reverse('posts:profile_follow', kwargs={'username': self.author})
+        )
+        self.listings = {
+            reverse('posts:index'): (self.guest_client, 2),
+            reverse(
+                'posts:group_list',
+                kwargs={'slug': self.group.slug}
+            ): (self.guest_client, 3),
+            reverse(
+                'posts:profile',
+                kwargs={'username': self.author.username}
+            ): (self.guest_client, 3),
+            reverse('posts:follow_index'): (self.authorized_client, 6),
+        }
+
+    def tearDown(self):
+        cache.clear()
+
+    def create_posts(self, count):
+        for number in range(count):
+            Post.objects.create(
+                text=f'Пост номер {number}',
+                author=self.author,
+                group=self.group,
+            )
+
+    def assert_listing_queries(self):
+        for url, (client, queries) in self.listings.items():
+            with self.subTest(url=url):
+                client.get(url)
+                cache.clear()
+                with self.assertNumQueries(queries):
+                    response = client.get(url)
+                self.assertTrue(response.context['page_obj'])
+
+    def test_single_post_page(self):
+        self.create_posts(1)
+        self.assert_listing_queries()
+
+    def test_full_page(self):
+        self.create_posts(POSTS_PER_PAGE * 2)
+        self.assert_listing_queries()
+
+
+class ListingIndexesTest(TestCase):
+    """Запросы листингов идут по составным индексам без сортировки."""
+
+    def explain(self, queryset):
+        sql, params = queryset[:POSTS_PER_PAGE].query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return ' '.join(row[-1] for row in cursor.fetchall())
+
+    @skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN')
+    def test_listing_plans_use_indexes(self):
+        listing = Post.objects.for_listing()
+        plans = {
+            'post_pub_date_id_idx': listing,
+            'post_group_pub_date_idx': listing.filter(group_id=1),
+            'post_author_pub_date_idx': listing.filter(author_id=1),
+            'timeline_user_pub_date_idx': timeline.feed(User(pk=1), [])[0],
+            'comment_post_created_idx': Comment.objects.filter(
+                post_id=1
+            ).order_by(*COMMENT_ORDERING),
+        }
+        for index, queryset in plans.items():
+            with self.subTest(index=index):
+                plan = self.explain(queryset)
+                self.assertIn(index, plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+
+class PostDetailQueriesTest(TestCase):
+    """Страница поста не делает запросов на каждый комментарий."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Ivank')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def add_comments(self, count):
+        start = self.post.comments.count()
+        for number in range(start, start + count):
+            Comment.objects.create(
+                text=f'Комментарий {number}',
+                post=self.post,
+                author=User.objects.create_user(username=f'reader{number}'),
+            )
+
+    def queries(self):
+        # Первый запрос заводит счётчики постов автора.
+        self.guest_client.get(self.url)
+        cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            self.guest_client.get(self.url)
+        return len(captured)
+
+    def test_queries_do_not_depend_on_comments(self):
+        self.add_comments(1)
+        single = self.queries()
+        self.add_comments(COMMENTS_PER_PAGE)
+        self.assertEqual(self.queries(), single)
+
+    def test_comments_are_paginated(self):
+        """Комментарии выводятся страницами, число берётся из поста."""
+        self.add_comments(COMMENTS_PER_PAGE + 1)
+        response = self.guest_client.get(self.url)
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_PER_PAGE)
+        self.assertContains(
+            response, f'Комментариев: {COMMENTS_PER_PAGE + 1}'
+        )
+        response = self.guest_client.get(
+            self.url, {'cursor': comments.next_cursor}
+        )
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            ['Комментарий 0'],
+        )
+
+
+class CurrentUserQueriesTest(TestCase):
+    """Представления читают текущего пользователя не больше одного раза."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='Ivank')
+        cls.post = Post.objects.create(text='Пост', author=cls.user)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def user_queries(self, method, url):
+        with CaptureQueriesContext(connection) as captured:
+            getattr(self.client, method)(url)
+        by_id = f'"auth_user"."id" = {self.user.pk}'
+        by_name = f'"auth_user"."username" = \'{self.user.username}\''
+        return [
+            query['sql'] for query in captured
+            if query['sql'].startswith('SELECT')
+            and (by_id in query['sql'] or by_name in query['sql'])
+        ]
+
+    def test_views_load_current_user_once(self):
+        own = {'username': self.user.username}
+        other = {'username': self.author.username}
+        post = {'post_id': self.post.pk}
+        views = (
+            ('get', reverse('posts:index')),
+            ('get', reverse('posts:profile', kwargs=own)),
+            ('get', reverse('posts:profile', kwargs=other)),
+            ('get', reverse('posts:post_detail', kwargs=post)),
+            ('get', reverse('posts:post_edit', kwargs=post)),
+            ('get', reverse('posts:follow_index')),
+            ('get', reverse('posts:profile_follow', kwargs=own)),
+            ('get', reverse('posts:profile_follow', kwargs=other)),
+            ('get', reverse('posts:profile_unfollow', kwargs=other)),
+            ('post', reverse('posts:add_comment', kwargs=post)),
+        )
+        for method, url in views:
+            with self.subTest(url=url):
+                self.assertLessEqual(
+                    len(self.user_queries(method, url)), 1
+                )
@@ -0,0 +1,121 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import search
+from ..constants import POSTS_PER_PAGE
+from ..models import Comment, Post
+from ..stemmer import stem
+
+User = get_user_model()
+
+
+class StemmerTest(TestCase):
+    def test_stem(self):
+        """Формы одного слова сводятся к общей основе."""
+        cases = {
+            'книга': 'книг',
+            'книгами': 'книг',
+            'красивейший': 'красив',
+            'читаешь': 'чита',
+            'прочитавши': 'прочита',
+            'ёлки': 'елк',
+            'Django': 'django',
+        }
+        for word, expected in cases.items():
+            with self.subTest(word=word):
+                self.assertEqual(stem(word), expected)
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Ivank')
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.url = reverse('posts:search')
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_finds_word_forms(self):
+        """Поиск находит пост по другой форме слова."""
+        post = Post.objects.create(
+            text='Читаю интересные книги', author=self.author
+        )
+        Post.objects.create(text='Про погоду', author=self.author)
+        response = self.guest_client.get(self.url, {'q': 'книгой'})
+        self.assertEqual(list(response.context['page_obj']), [post])
+
+    def test_ranking(self):
+        """Совпадение в тексте поста важнее совпадения в комментарии."""
+        commented = Post.objects.create(text='Про погоду', author=self.author)
+        Comment.objects.create(
+            text='Похоже на сказку', post=commented, author=self.author
+        )
+        post = Post.objects.create(
+            text='Сказки на ночь', author=self.author
+        )
+        self.assertEqual(search.search_ids('сказка'), [post.pk, commented.pk])
+
+    def test_index_follows_changes(self):
+        """Правки и удаления сразу отражаются в индексе."""
+        post = Post.objects.create(text='Старый текст', author=self.author)
+        post.text = 'Новый текст'
+        post.save()
+        self.assertEqual(search.search_ids('старый'), [])
+        self.assertEqual(search.search_ids('новые'), [post.pk])
+        post.delete()
+        self.assertEqual(search.search_ids('новые'), [])
+
+    def test_pagination_keeps_query(self):
+        """Страницы результатов сохраняют запрос в ссылках пагинатора."""
+        Post.objects.bulk_create(
+            Post(text=f'Заметка {number}', author=self.author)
+            for number in range(POSTS_PER_PAGE + 1)
+        )
+        call_command('rebuild_search_index', stdout=StringIO())
+        response = self.guest_client.get(self.url, {'q': 'заметки'})
+        self.assertEqual(response.context['page_obj'].paginator.count,
+                         POSTS_PER_PAGE + 1)
+        self.assertContains(response, '?page=2&amp;q=%D0%B7')
+        response = self.guest_client.get(
+            self.url, {'q': 'заметки', 'page': 2}
+        )
+        self.assertEqual(len(response.context['page_obj']), 1)
+
+    def test_admin_search_is_not_limited(self):
+        """Админка находит все посты, а не первые SEARCH_LIMIT."""
+        Post.objects.bulk_create(
+            Post(text=f'Заметка {number}', author=self.author)
+            for number in range(3)
+        )
+        commented = Post.objects.create(text='Без слова', author=self.author)
+        Comment.objects.create(
+            text='Хорошая заметка', post=commented, author=self.author
+        )
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(search.search_ids('заметки', limit=2)), 2)
+        found = search.filter_posts(Post.objects.all(), 'заметки')
+        self.assertEqual(found.count(), 4)
+        self.assertIn(commented, found)
+        admin = User.objects.create_superuser(
+            'admin', 'admin@yatube.ru', 'password'
+        )
+        self.guest_client.force_login(admin)
+        response = self.guest_client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'заметки'}
+        )
+        self.assertEqual(response.context['cl'].result_count, 4)
+
+    def test_empty_query(self):
+        """Пустой запрос показывает форму без результатов."""
+        response = self.guest_client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page_obj']), 0)
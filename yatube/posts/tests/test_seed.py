@@ -0,0 +1,37 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from .. import counters
+from ..models import Comment, Follow, Group, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class SeedCommandTest(TestCase):
+    def seed(self, prefix):
+        call_command(
+            'seed',
+            users=30, groups=3, posts=60, follows=80, comments=40,
+            batch=25, workers=1, prefix=prefix, stdout=StringIO(),
+        )
+        return list(
+            Post.objects.filter(author__username__startswith=prefix)
+            .order_by('pk').values_list('text', flat=True)
+        )
+
+    def test_seed_creates_consistent_dataset(self):
+        """seed создаёт данные, счётчики и ленты без расхождений."""
+        texts = self.seed('seed')
+        expected = {
+            User: 30, Group: 3, Post: 60, Comment: 40,
+        }
+        for model, count in expected.items():
+            with self.subTest(model=model.__name__):
+                self.assertEqual(model.objects.count(), count)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertEqual(counters.reconcile(), (0, 0, 0))
+        self.assertEqual(self.seed('again'), texts)
@@ -0,0 +1,37 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from django.urls import reverse, set_script_prefix
+
+from .. import links
+
+
+class LinksTest(SimpleTestCase):
+    def tearDown(self):
+        set_script_prefix('/')
+
+    def test_links_match_reverse(self):
+        """Готовые адреса совпадают с reverse, включая префикс скрипта."""
+        cases = (
+            (links.post_url, 'posts:post_detail', 'post_id', 42),
+            (links.group_url, 'posts:group_list', 'slug', 'cats-2'),
+            (links.profile_url, 'posts:profile', 'username', 'Иван.И+1'),
+        )
+        for prefix in ('/', '/yatube/'):
+            set_script_prefix(prefix)
+            for build, name, kwarg, value in cases:
+                with self.subTest(prefix=prefix, name=name):
+                    self.assertEqual(
+                        build(value), reverse(name, kwargs={kwarg: value})
+                    )
+
+
+class BenchTemplatesTest(SimpleTestCase):
+    def test_bench_reports_every_variant(self):
+        """Замер рендерит страницу без базы для всех вариантов."""
+        output = StringIO()
+        call_command('bench_templates', sizes=[3], repeat=2, stdout=output)
+        lines = output.getvalue().splitlines()[1:]
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(all(line.split()[0] == '3' for line in lines))
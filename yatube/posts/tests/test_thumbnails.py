@@ -0,0 +1,109 @@
+import json
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from core.models import Task
+from core.tasks import work
+
+from .. import conditional, fragments, tasks, thumbnails
+from ..models import Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+class ThumbnailLookupTest(TestCase):
+    def test_missing_thumbnail_falls_back_to_placeholder(self):
+        """Без готовой миниатюры шаблон получает заглушку нужного размера."""
+        image = mock.Mock(name='image')
+        image.name = 'posts/missing.gif'
+        with mock.patch('posts.thumbnails.get_thumbnail') as get_thumbnail:
+            im = thumbnails.thumbnail(image, 'card')
+        get_thumbnail.assert_not_called()
+        self.assertIsInstance(im, thumbnails.Placeholder)
+        self.assertEqual((im.width, im.height), (960, 339))
+        self.assertIsNone(thumbnails.thumbnail(None, 'card'))
+
+    def test_generate_builds_missing_sizes_and_resets_card(self):
+        """generate строит все размеры и сбрасывает кеш карточки."""
+        version = fragments.version_key('post', 1)
+        cache.set(version, 'old')
+        with mock.patch('posts.thumbnails.get_thumbnail') as get_thumbnail:
+            built = thumbnails.generate(1, 'posts/small.gif')
+        self.assertEqual(built, list(thumbnails.THUMBNAIL_SIZES))
+        self.assertEqual(get_thumbnail.call_count, len(built))
+        self.assertNotEqual(cache.get(version), 'old')
+
+    def test_generate_touches_pages_with_post(self):
+        """Готовые миниатюры меняют ETag страниц, где видна карточка."""
+        post = Post.objects.create(
+            text='С картинкой',
+            author=User.objects.create_user(username='Ivank'),
+        )
+        scopes = [
+            conditional.POSTS,
+            conditional.post_scope(post.pk),
+            conditional.author_scope('Ivank'),
+        ]
+        later = conditional.changed(scopes) + 1
+        with mock.patch('posts.conditional.time.time', return_value=later):
+            with mock.patch('posts.thumbnails.get_thumbnail'):
+                thumbnails.generate(post.pk, 'posts/small.gif')
+        for scope in scopes:
+            with self.subTest(scope=scope):
+                self.assertEqual(conditional.changed([scope]), later)
+
+    @override_settings(TASKS_EAGER=False)
+    def test_failed_job_is_retried(self):
+        """Ошибка хранилища оставляет задачу в очереди на повтор."""
+        tasks.generate_thumbnails.delay(1, 'posts/small.gif')
+        with mock.patch(
+            'posts.thumbnails.get_thumbnail', side_effect=OSError('диск')
+        ):
+            work(burst=True)
+        queued = Task.objects.get(name=tasks.generate_thumbnails.name)
+        self.assertEqual(
+            (queued.status, queued.attempts), (Task.PENDING, 1)
+        )
+        self.assertIn('OSError', queued.last_error)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailScheduleTest(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    @override_settings(TASKS_EAGER=False)
+    def test_saved_image_is_queued_after_commit(self):
+        """Пост с картинкой ставит генерацию миниатюр в очередь."""
+        author = User.objects.create_user(username='Ivank')
+        Post.objects.create(text='Без картинки', author=author)
+        post = Post.objects.create(
+            text='С картинкой',
+            author=author,
+            image=SimpleUploadedFile(
+                'small.gif', SMALL_GIF, content_type='image/gif'
+            ),
+        )
+        queued = Task.objects.get(name=tasks.generate_thumbnails.name)
+        self.assertEqual(
+            json.loads(queued.arguments), [[post.pk, post.image.name], {}]
+        )
@@ -0,0 +1,83 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.user = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.old_post = Post.objects.create(text='Старый', author=self.author)
+
+    def follow(self, action='posts:profile_follow'):
+        self.authorized_client.get(
+            reverse(action, kwargs={'username': self.author.username})
+        )
+
+    def feed(self):
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        return [post.pk for post in response.context['page_obj']]
+
+    def test_follow_backfills_and_unfollow_trims(self):
+        """Подписка дозаполняет ленту, отписка очищает её."""
+        self.follow()
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.user, post=self.old_post
+            ).exists()
+        )
+        self.follow('posts:profile_unfollow')
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user))
+        self.assertEqual(self.feed(), [])
+
+    def test_new_post_is_pushed_to_followers(self):
+        """Новый пост раскладывается по лентам подписчиков."""
+        self.follow()
+        post = Post.objects.create(text='Новый', author=self.author)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user, post=post).exists()
+        )
+        self.assertEqual(self.feed(), [post.pk, self.old_post.pk])
+
+    @mock.patch('posts.timeline.TIMELINE_FANOUT_LIMIT', 0)
+    def test_heavy_author_posts_are_pulled(self):
+        """Посты авторов с большим числом подписчиков читаются напрямую."""
+        self.follow()
+        post = Post.objects.create(text='Новый', author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user))
+        self.assertEqual(self.feed(), [post.pk, self.old_post.pk])
+
+    def test_author_below_limit_is_refilled(self):
+        """Посты, опубликованные сверх лимита, попадают в ленту позже."""
+        other = User.objects.create_user(username='other')
+        self.follow()
+        Follow.objects.create(user=other, author=self.author)
+        with mock.patch('posts.timeline.TIMELINE_FANOUT_LIMIT', 1):
+            post = Post.objects.create(text='Сверх лимита', author=self.author)
+            self.assertFalse(TimelineEntry.objects.filter(post=post))
+            Follow.objects.filter(user=other).delete()
+        self.assertEqual(self.feed(), [post.pk, self.old_post.pk])
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user, post=post).exists()
+        )
+
+    @mock.patch('posts.timeline.TIMELINE_BACKFILL', 1)
+    def test_count_matches_stored_entries(self):
+        """Число постов ленты — это число записей в ней, а не у авторов."""
+        Post.objects.create(text='Новый', author=self.author)
+        self.follow()
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['page_obj'].paginator.count, 1)
+        self.assertEqual(len(response.context['page_obj']), 1)
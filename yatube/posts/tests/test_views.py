@@ -237,7 +237,7 @@ class PostPagesTests(TestCase):
         authorized_client.force_login(user)
         follow_count = Follow.objects.filter(
             user=user,
-            following=author1
+            author=author1
         ).count()
         authorized_client.get(
             reverse(
@@ -248,7 +248,7 @@ class PostPagesTests(TestCase):
         self.assertEqual(
             Follow.objects.filter(
                 user=user,
-                following=author1
+                author=author1
             ).count(),
             follow_count + 1
         )
@@ -261,7 +261,7 @@ class PostPagesTests(TestCase):
         self.assertEqual(
             Follow.objects.filter(
                 user=user,
-                following=author1
+                author=author1
             ).count(),
             follow_count
         )
@@ -0,0 +1,83 @@
+"""Предварительная генерация миниатюр картинок постов.
+
+Миниатюры всех размеров из `THUMBNAIL_SIZES` строятся фоновой задачей
+(`posts.tasks.generate_thumbnails`), которая ставится после коммита
+транзакции, в которой сохранён пост с картинкой.
+Шаблоны только ищут готовую миниатюру в key-value store sorl и, пока её
+нет, показывают заглушку того же размера: запрос не открывает исходный
+файл и не вызывает PIL. Готовая миниатюра сбрасывает кеш карточки поста
+(`posts.fragments`) и валидаторы страниц с ней (`posts.conditional`),
+чтобы заглушка не задержалась ни в кеше, ни у клиента.
+
+Ошибки генерации не перехватываются: упавшую задачу очередь повторит.
+Неисправимые ошибки — битый или пропавший исходный файл — sorl сам
+записывает в лог, не прерывая задачу.
+"""
+from collections import namedtuple
+
+from django.templatetags.static import static
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings, settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.parsers import parse_geometry
+
+from . import conditional, fragments
+from .constants import THUMBNAIL_SIZES
+
+PLACEHOLDER = 'img/placeholder.svg'
+
+Placeholder = namedtuple('Placeholder', 'url width height')
+
+
+class LookupBackend(ThumbnailBackend):
+    def lookup(self, file_, geometry_string, **options):
+        """Готовая миниатюра из key-value store или None.
+
+        Имя миниатюры вычисляется так же, как в
+        `ThumbnailBackend.get_thumbnail`, но сама миниатюра не создаётся.
+        """
+        source = ImageFile(file_)
+        if settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+
+backend = LookupBackend()
+
+
+def lookup(name, size):
+    geometry, options = THUMBNAIL_SIZES[size]
+    return backend.lookup(name, geometry, **options)
+
+
+def placeholder(size):
+    geometry, _ = THUMBNAIL_SIZES[size]
+    width, height = parse_geometry(geometry)
+    return Placeholder(static(PLACEHOLDER), width, height)
+
+
+def thumbnail(image, size):
+    """Миниатюра картинки `image` размера `size` или заглушка."""
+    if not image:
+        return None
+    return lookup(image.name, size) or placeholder(size)
+
+
+def generate(post_id, name):
+    """Построить недостающие миниатюры картинки `name` поста `post_id`."""
+    missing = [size for size in THUMBNAIL_SIZES if not lookup(name, size)]
+    for size in missing:
+        geometry, options = THUMBNAIL_SIZES[size]
+        get_thumbnail(name, geometry, **options)
+    if missing:
+        fragments.bump('post', post_id)
+        conditional.touch_post(post_id)
+    return missing
@@ -0,0 +1,180 @@
+"""Материализованная лента подписок.
+
+При публикации пост раскладывается (fan-out) в `TimelineEntry` всех
+подписчиков автора, и лента читается одним запросом по индексу
+`(user, -pub_date, -id)`. Для авторов, у которых подписчиков больше
+`TIMELINE_FANOUT_LIMIT`, раскладка слишком дорогая: их посты в ленту
+не пишутся, а подмешиваются при чтении (pull). Когда подписчиков снова
+становится не больше лимита, `refill` раскладывает пропущенные посты.
+"""
+from django.db import connection
+from django.db.models import Count, Q
+
+from . import counters
+from .constants import (
+    KEYSET_ORDERING, TIMELINE_BACKFILL, TIMELINE_FANOUT_LIMIT
+)
+from .models import Follow, Post, PostQuerySet, TimelineEntry
+
+
+def is_heavy(author_id):
+    return counters.followers_count(author_id) > TIMELINE_FANOUT_LIMIT
+
+
+def push(post):
+    """Разложить новый пост по лентам подписчиков автора."""
+    if is_heavy(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=pk, post=post, pub_date=post.pub_date)
+            for pk in followers.iterator()
+        ),
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавить в ленту последние посты автора после подписки."""
+    if is_heavy(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date'
+    )[:TIMELINE_BACKFILL]
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in posts
+        ),
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+def became_light(author_id):
+    """Подписчиков автора только что стало ровно TIMELINE_FANOUT_LIMIT."""
+    return counters.followers_count(author_id) == TIMELINE_FANOUT_LIMIT
+
+
+def refill(author_id):
+    """Разложить посты автора, который перестал быть «тяжёлым».
+
+    Пока автор был «тяжёлым», его посты подмешивались при чтении и
+    записей в лентах не получали. Как и `backfill`, добавляет последние
+    TIMELINE_BACKFILL постов, но всем подписчикам одним INSERT ... SELECT
+    и без уже разложенных. Возвращает число созданных записей.
+    """
+    if is_heavy(author_id):
+        return 0
+    quote = connection.ops.quote_name
+    timeline = quote(TimelineEntry._meta.db_table)
+    sql = (
+        f'INSERT INTO {timeline} (user_id, post_id, pub_date) '
+        f'SELECT f.user_id, p.id, p.pub_date '
+        f'FROM {quote(Follow._meta.db_table)} f, ('
+        f' SELECT id, pub_date FROM {quote(Post._meta.db_table)}'
+        f' WHERE author_id = %s ORDER BY pub_date DESC LIMIT %s'
+        f') p '
+        f'WHERE f.author_id = %s AND NOT EXISTS ('
+        f' SELECT 1 FROM {timeline} t'
+        f' WHERE t.user_id = f.user_id AND t.post_id = p.id'
+        f')'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [author_id, TIMELINE_BACKFILL, author_id])
+        return cursor.rowcount
+
+
+def trim(user_id, author_id):
+    """Убрать из ленты посты автора после отписки."""
+    TimelineEntry.objects.filter(
+        user_id=user_id,
+        post__author_id=author_id,
+    ).delete()
+
+
+def feed(user, author_ids):
+    """Записи ленты пользователя и их число.
+
+    Обычно это `TimelineEntry` читателя в порядке индекса
+    `(user, -pub_date, -id)`: страница читается по нему вместе с
+    постами через JOIN, `posts()` достаёт их из записей. Число — это
+    число записей, которые реально лежат в ленте. Если среди авторов
+    есть «тяжёлые», их посты подмешиваются к записям, и лента читается
+    из таблицы постов.
+    """
+    post_keys = [counters.author_key(pk) for pk in author_ids]
+    follower_keys = [counters.followers_key(pk) for pk in author_ids]
+    values = counters.get_many(post_keys + follower_keys)
+    pulled = [
+        pk for pk, key in zip(author_ids, follower_keys)
+        if values[key] > TIMELINE_FANOUT_LIMIT
+    ]
+    entries = TimelineEntry.objects.filter(user=user)
+    count = entries.count()
+    if not pulled:
+        listing = ('post', 'post__author', 'post__group') + tuple(
+            f'post__{field}' for field in PostQuerySet.LISTING_FIELDS
+        )
+        return entries.select_related(
+            'post__author', 'post__group'
+        ).only('pub_date', *listing).order_by(*KEYSET_ORDERING), count
+    count += sum(values[counters.author_key(pk)] for pk in pulled)
+    posts = Post.objects.filter(
+        Q(pk__in=entries.values('post_id')) | Q(author__in=pulled)
+    )
+    return posts.for_listing(), count
+
+
+def posts(page):
+    """Заменить записи ленты на странице их постами."""
+    entries = list(page.object_list)
+    if entries and isinstance(entries[0], TimelineEntry):
+        page.object_list = [entry.post for entry in entries]
+    return page
+
+
+def heavy_authors():
+    """Авторы, чьи посты не раскладываются по лентам."""
+    return list(
+        Follow.objects.values('author').annotate(total=Count('pk'))
+        .filter(total__gt=TIMELINE_FANOUT_LIMIT)
+        .values_list('author', flat=True)
+    )
+
+
+def fill(follows_from=0):
+    """Разложить посты по лентам подписок с id больше `follows_from`.
+
+    Для загрузки данных в обход сигналов: один INSERT ... SELECT вместо
+    `backfill` на каждую подписку. Как и там, в ленту попадают последние
+    TIMELINE_BACKFILL постов автора, посты «тяжёлых» авторов пропускаются.
+    Возвращает число созданных записей.
+    """
+    heavy = heavy_authors()
+    quote = connection.ops.quote_name
+    sql = (
+        f'INSERT INTO {quote(TimelineEntry._meta.db_table)} '
+        f'(user_id, post_id, pub_date) '
+        f'SELECT f.user_id, p.id, p.pub_date '
+        f'FROM {quote(Follow._meta.db_table)} f '
+        f'JOIN ('
+        f' SELECT id, author_id, pub_date, ROW_NUMBER() OVER ('
+        f'  PARTITION BY author_id ORDER BY pub_date DESC'
+        f' ) AS position FROM {quote(Post._meta.db_table)}'
+        f') p ON p.author_id = f.author_id '
+        f'WHERE f.id > %s AND p.position <= %s'
+    )
+    params = [follows_from, TIMELINE_BACKFILL]
+    if heavy:
+        sql += ' AND f.author_id NOT IN (%s)' % ', '.join(
+            '%s' for _ in heavy
+        )
+        params.extend(heavy)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
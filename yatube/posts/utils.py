@@ -1,8 +1,237 @@
-from django.core.paginator import Paginator
+import base64
+import collections.abc
+import json
+from contextlib import contextmanager
+from types import SimpleNamespace
 
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Paginator
+from django.db.models import Q
 
-def pagi(request, post_list, posts_per_page: int):
-    paginator = Paginator(post_list, posts_per_page)
+from .constants import KEYSET_ORDERING, KEYSET_PAGINATION
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage(collections.abc.Sequence):
+    """Страница пагинатора по ключу: без номера и общего числа страниц."""
+    is_keyset = True
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<KeysetPage of %s objects>' % len(self)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+
+class CountedPaginator(Paginator):
+    """Paginator с заранее известным числом записей.
+
+    Число берётся из денормализованных счётчиков (`posts.counters`) и может
+    быть приближённым, зато не требует `COUNT(*)` на каждый запрос.
+    """
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count = count
+
+
+class EstimatedPaginator(CountedPaginator):
+    """CountedPaginator, у которого число записей — оценка снизу.
+
+    Страницы за оценкой открываются по номеру: срез читается без
+    сверки с `num_pages`, и только пустая страница считается ошибкой.
+    """
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            number = int(number)
+            if number < 1:
+                raise
+            return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if number <= self.num_pages:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        object_list = self.object_list[bottom:bottom + self.per_page]
+        if not object_list:
+            raise EmptyPage('Страница пуста')
+        return self._get_page(object_list, number, self)
+
+
+class KeysetPaginator:
+    """Пагинация по ключу сортировки (seek method).
+
+    Страница выбирается условием `WHERE (pub_date, id) < (...)` и `LIMIT`,
+    поэтому стоимость запроса не зависит от глубины страницы и не требует
+    `COUNT(*)`. Курсоры непрозрачны для клиента: это закодированные
+    значения ключа первой или последней записи страницы.
+    """
+
+    def __init__(self, object_list, per_page, ordering=KEYSET_ORDERING):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.descending = self.ordering[0].startswith('-')
+        self.fields = tuple(field.lstrip('-') for field in self.ordering)
+
+    def get_page(self, cursor):
+        """Вернуть страницу, начиная с первой при неверном курсоре."""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page(None)
+
+    def page(self, cursor):
+        if not cursor:
+            return self._forward(self.object_list, first=True)
+        backward, values = self.decode_cursor(cursor)
+        if backward:
+            page = self._backward(values)
+            return page if page else self.page(None)
+        queryset = self.object_list.filter(self.seek(values, after=True))
+        return self._forward(queryset, first=False)
+
+    def _forward(self, queryset, first):
+        rows = list(queryset.order_by(*self.ordering)[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return KeysetPage(
+            rows,
+            self,
+            next_cursor=self._cursor(rows[-1]) if has_next else None,
+            previous_cursor=(
+                None if first or not rows
+                else self._cursor(rows[0], backward=True)
+            ),
+        )
+
+    def _backward(self, values):
+        reverse = [
+            field[1:] if field.startswith('-') else '-' + field
+            for field in self.ordering
+        ]
+        queryset = self.object_list.filter(self.seek(values, after=False))
+        rows = list(queryset.order_by(*reverse)[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        return KeysetPage(
+            rows,
+            self,
+            next_cursor=self._cursor(rows[-1]) if rows else None,
+            previous_cursor=(
+                self._cursor(rows[0], backward=True) if has_previous
+                else None
+            ),
+        )
+
+    def seek(self, values, after=True):
+        """Условие «строго после/до» ключа `values`.
+
+        Строится как `pub_date <= d AND (pub_date < d OR id < i)`: ведущее
+        условие по первому полю позволяет SQLite идти по индексу диапазоном,
+        тогда как `pub_date < d OR (pub_date = d AND id < i)` планировщик
+        разбивает на несколько поисков с сортировкой во временном дереве.
+        """
+        strict = 'lt' if self.descending == after else 'gt'
+        loose = f'{strict}e'
+        fields = list(zip(self.fields, values))
+        field, value = fields.pop()
+        condition = Q(**{f'{field}__{strict}': value})
+        for field, value in reversed(fields):
+            condition = Q(**{f'{field}__{loose}': value}) & (
+                Q(**{f'{field}__{strict}': value}) | condition
+            )
+        return condition
+
+    def _cursor(self, obj, backward=False):
+        if isinstance(obj, dict):
+            # Строка из .values(): у value_to_string нужен атрибут объекта.
+            obj = SimpleNamespace(**{
+                self._field(name).attname: obj[name] for name in self.fields
+            })
+        values = [
+            self._field(name).value_to_string(obj) for name in self.fields
+        ]
+        payload = json.dumps([int(backward)] + values).encode()
+        return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        padding = '=' * (-len(cursor) % 4)
+        try:
+            backward, *raw = json.loads(
+                base64.urlsafe_b64decode(cursor + padding)
+            )
+        except (ValueError, TypeError) as error:
+            raise InvalidCursor(cursor) from error
+        # Курсор хранит значения строками (value_to_string), а to_python
+        # на числах и списках падает не с ValidationError.
+        if len(raw) != len(self.fields) or not all(
+            isinstance(value, str) for value in raw
+        ):
+            raise InvalidCursor(cursor)
+        try:
+            values = [
+                self._field(name).to_python(value)
+                for name, value in zip(self.fields, raw)
+            ]
+        except ValidationError as error:
+            raise InvalidCursor(cursor) from error
+        return bool(backward), values
+
+    def _field(self, name):
+        return self.object_list.model._meta.get_field(name)
+
+
+def pagi(request, post_list, posts_per_page: int,
+         keyset: bool = None, count=None):
+    # Явный keyset=False — для списков, которые не являются QuerySet.
+    if keyset is None:
+        keyset = KEYSET_PAGINATION or 'cursor' in request.GET
+    if keyset:
+        paginator = KeysetPaginator(post_list, posts_per_page)
+        return paginator.get_page(request.GET.get('cursor'))
+    if count is None:
+        paginator = Paginator(post_list, posts_per_page)
+    else:
+        paginator = CountedPaginator(post_list, posts_per_page, count)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Дать bulk_create записать даты, которые обычно ставит auto_now_add."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
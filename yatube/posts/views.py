@@ -1,19 +1,31 @@
+from urllib.parse import urlencode
+
 from django.contrib.auth.decorators import login_required
-from django.shortcuts import get_object_or_404, redirect, render
-from .constants import POSTS_PER_PAGE
+from django.shortcuts import redirect, render
+
+from core.identity import identity
+
+from . import conditional, counters, search, timeline
+from .follows import is_following
+from .constants import COMMENT_ORDERING, COMMENTS_PER_PAGE, POSTS_PER_PAGE
 from .forms import PostForm, CommentForm
-from .models import Group, Post, User
-from .utils import pagi
-from django.views.decorators.cache import cache_page
+from .models import Follow, Group, Post, User
+from .utils import KeysetPaginator, pagi
 
 
+@conditional.validated(conditional.group_scopes)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
+    group = identity(request).get_or_404(Group, slug=slug)
     template = 'posts/group_list.html'
-    post_list = group.posts.all()
+    post_list = group.posts.for_listing()
     context = {
         'title': group.title,
-        'page_obj': pagi(request, post_list, POSTS_PER_PAGE),
+        'page_obj': pagi(
+            request,
+            post_list,
+            POSTS_PER_PAGE,
+            count=counters.group_posts_count(group),
+        ),
         'description': group.description,
     }
     return render(
@@ -23,14 +35,19 @@ def group_posts(request, slug):
     )
 
 
-@cache_page(20)
+@conditional.validated(conditional.index_scopes)
 def index(request):
     template = 'posts/index.html'
     title = 'Последние обновления на сайте'
-    post_list = Post.objects.all()
+    post_list = Post.objects.for_listing()
     context = {
         'title': title,
-        'page_obj': pagi(request, post_list, POSTS_PER_PAGE),
+        'page_obj': pagi(
+            request,
+            post_list,
+            POSTS_PER_PAGE,
+            count=counters.posts_count(),
+        ),
     }
     return render(
         request,
@@ -39,43 +56,69 @@ def index(request):
     )
 
 
+def search_posts(request):
+    template = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+    results = search.search(query) if query else []
+    context = {
+        'title': f'Поиск: {query}' if query else 'Поиск',
+        'query': query,
+        'page_obj': pagi(request, results, POSTS_PER_PAGE, keyset=False),
+        'extra_query': '&' + urlencode({'q': query}),
+    }
+    return render(request, template, context)
+
+
+@conditional.validated(conditional.profile_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    if not User.objects.filter(pk=request.user.id).exists():
-        post_list = author.author_posts.all()
+    author = identity(request).get_or_404(User, username=username)
+    if not request.user.is_authenticated:
+        post_list = author.author_posts.for_listing()
+        posts_count = counters.author_posts_count(author)
         title = 'Профайл пользователя'
         context = {
             'title': title,
-            'page_obj': pagi(request, post_list, POSTS_PER_PAGE),
+            'page_obj': pagi(
+                request, post_list, POSTS_PER_PAGE, count=posts_count
+            ),
             'author': author,
-            'posts_count': post_list.count(),
+            'posts_count': posts_count,
         }
         return render(request, 'posts/profile.html', context)
-    curent_user = get_object_or_404(User, username=request.user.username)
-    follower = False
-    following = curent_user.follower.following
-    if following.filter(pk=author.pk).exists():
-        follower = True
-    post_list = author.author_posts.all()
+    curent_user = request.user
+    follower = author.pk in is_following(curent_user, [author])
+    post_list = author.author_posts.for_listing()
+    posts_count = counters.author_posts_count(author)
     title = 'Профайл пользователя'
     if request.method == 'POST':
         profile_follow(data=request.POST)
     context = {
         'title': title,
-        'page_obj': pagi(request, post_list, POSTS_PER_PAGE),
+        'page_obj': pagi(
+            request, post_list, POSTS_PER_PAGE, count=posts_count
+        ),
         'author': author,
         'curent_user': curent_user,
-        'posts_count': post_list.count(),
+        'posts_count': posts_count,
         'following': follower,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@conditional.validated(conditional.post_scopes)
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, id=post_id)
-    posts_count = Post.objects.filter(author=post.author).count()
-    comments = post.comments.all()
+    post = identity(request).get_or_404(
+        Post.objects.select_related('author', 'group'), id=post_id
+    )
+    posts_count = counters.author_posts_count(post.author)
+    comments = KeysetPaginator(
+        post.comments.select_related('author').only(
+            'text', 'created', 'post', 'author__username'
+        ),
+        COMMENTS_PER_PAGE,
+        COMMENT_ORDERING,
+    ).get_page(request.GET.get('cursor'))
     if request.method == 'POST':
         form = post_create(data=request.POST)
     else:
@@ -117,8 +160,8 @@ def post_create(request):
 
 @login_required
 def post_edit(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    if post.author != request.user:
+    post = identity(request).get_or_404(Post, id=post_id)
+    if post.author_id != request.user.pk:
         return redirect('posts:post_detail', post_id=post_id)
     if request.method == 'POST':
         form = PostForm(
@@ -146,7 +189,7 @@ def post_edit(request, post_id):
 
 @login_required
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = identity(request).get_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
@@ -161,12 +204,19 @@ def add_comment(request, post_id):
 def follow_index(request):
     template = 'posts/follow.html'
     title = 'Последние обновления в подписках'
-    user = get_object_or_404(User, username=request.user)
-    following = user.follower.following.all()
-    post_list = Post.objects.filter(author__in=following)
+    user = request.user
+    following = list(
+        Follow.objects.filter(user=user).values_list('author_id', flat=True)
+    )
+    post_list, posts_count = timeline.feed(user, following)
     context = {
         'title': title,
-        'page_obj': pagi(request, post_list, POSTS_PER_PAGE),
+        'page_obj': timeline.posts(pagi(
+            request,
+            post_list,
+            POSTS_PER_PAGE,
+            count=posts_count,
+        )),
     }
     return render(request, template, context)
 
@@ -174,22 +224,15 @@ def follow_index(request):
 @login_required
 def profile_follow(request, username):
     template = 'posts:profile'
-    author = get_object_or_404(User, username=username)
-    curent_user = get_object_or_404(User, username=request.user.username)
-    if author != curent_user:
-        following = curent_user.follower.following
-        if not following.filter(pk=author.pk).exists():
-            following.add(author)
+    author = identity(request).get_or_404(User, username=username)
+    if author != request.user:
+        Follow.objects.get_or_create(user=request.user, author=author)
     return redirect(template, author)
 
 
 @login_required
 def profile_unfollow(request, username):
     template = 'posts:profile'
-    author = get_object_or_404(User, username=username)
-    curent_user = get_object_or_404(User, username=request.user.username)
-    if author != curent_user.username:
-        following = curent_user.follower.following
-        if following.filter(pk=author.pk).exists():
-            following.remove(author)
+    author = identity(request).get_or_404(User, username=username)
+    Follow.objects.filter(user=request.user, author=author).delete()
     return redirect(template, author)
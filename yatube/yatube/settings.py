@@ -20,7 +20,15 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION',
+            os.path.join(BASE_DIR, 'cache', 'yatube.sqlite3'),
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'CULL_FREQUENCY': 10,
+        },
     }
 }
 
@@ -40,6 +48,7 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -50,23 +59,36 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.InstrumentationMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+# Скомпилированные шаблоны кешируются в памяти процесса: правки шаблонов
+# видны только после перезапуска. CACHED_TEMPLATES=1 включает кеш и при
+# DEBUG, например для замеров.
+CACHED_TEMPLATES = not DEBUG or os.getenv('CACHED_TEMPLATES') == '1'
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.templates.TimedTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': (
+                [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+                if CACHED_TEMPLATES else TEMPLATE_LOADERS
+            ),
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -88,6 +110,22 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения: пути к копиям базы через запятую. Локально
+# их можно обновлять командой `manage.py sync_replicas`.
+DATABASE_REPLICAS = []
+for number, name in enumerate(
+    filter(None, os.getenv('DATABASE_REPLICA_FILES', '').split(',')), 1
+):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# Сколько секунд после записи клиент читает из основной базы.
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 5))
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -118,12 +156,39 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+STATIC_ROOT = os.getenv(
+    'STATIC_ROOT', os.path.join(BASE_DIR, 'collected_static')
+)
+# Хеши в именах и сжатые копии (core.staticfiles). Собираются
+# collectstatic, поэтому при DEBUG выключены; COMPRESSED_STATIC=1
+# включает их и при DEBUG.
+COMPRESSED_STATIC = not DEBUG or os.getenv('COMPRESSED_STATIC') == '1'
+if COMPRESSED_STATIC:
+    STATICFILES_STORAGE = 'core.staticfiles.CompressedManifestStorage'
+
+# Сессии в общем кеше, в базе — отложенное зеркало (core.sessions).
+SESSION_ENGINE = 'core.sessions'
+# Изменения сессии попадают в базу не чаще раза в столько секунд.
+SESSION_MIRROR_INTERVAL = 5 * 60
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+# Чем воркер очереди на самом деле отправляет письма.
+QUEUED_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+# Фоновые задачи (core.tasks). При TASKS_EAGER=1 выполняются сразу,
+# без воркеров manage.py run_workers.
+TASKS_EAGER = os.getenv('TASKS_EAGER') == '1'
+TASK_MAX_ATTEMPTS = 5
+# Задержка перед первым повтором, секунд; дальше удваивается.
+TASK_RETRY_DELAY = 10
+# Задача, которую воркер держит дольше, возвращается в очередь.
+TASK_TIMEOUT = 10 * 60
+
+TEST_RUNNER = 'core.runner.TestRunner'
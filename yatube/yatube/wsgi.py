@@ -13,4 +13,7 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
-application = get_wsgi_application()
+from core.staticfiles import StaticFilesApplication  # noqa: E402
+
+# Статика из STATIC_ROOT отдаётся до Django (см. core.staticfiles).
+application = StaticFilesApplication(get_wsgi_application())